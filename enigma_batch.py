@@ -0,0 +1,137 @@
+from itertools import product
+import numpy as np
+from enigma_code import *
+# Vectorised engine which runs a whole batch of candidate machine settings at once with NumPy.
+# Each row of the settings arrays is one machine, characters are handled as integers (0 = A ... 25 = Z).
+
+class BatchEnigma:
+    def __init__(self, rotor_names, reflector_names, rotor_source=rotor_from_name, reflector_source=reflector_from_name):
+        # builds wiring and notch arrays for the pools of rotors and reflectors that candidates may use
+        # rotor_source and reflector_source allow other sets of wirings e.g. enigmaadvanced_code.rotor_from_name
+        self.rotor_names = list(rotor_names)
+        self.reflector_names = list(reflector_names)
+        rotors = [rotor_source(name) for name in self.rotor_names]
+        reflectors = [reflector_source(name) for name in self.reflector_names]
+        # forward[r] is rotor r right to left, backward[r] is left to right
+        self.forward = np.array([rotor.tables[0] for rotor in rotors], dtype=np.int64)
+        self.backward = np.array([rotor.tables[1] for rotor in rotors], dtype=np.int64)
+        self.reflectors = np.array([reflector.tables[0] for reflector in reflectors], dtype=np.int64)
+        # notches[r, p] is true when rotor r turns its neighbour from position p, notchless rotors never do
+        self.notches = np.zeros((len(rotors), 26), dtype=bool)
+        for r, rotor in enumerate(rotors):
+            # checks for a notch attribute so NotchRotor classes from other modules are recognised too
+            for notch in getattr(rotor, "notch", ""):
+                self.notches[r, ord(notch) - 65] = True
+
+    def rotor_index(self, names):
+        # converts rotor names e.g. "Beta I III" into a row of indices into the rotor pool
+        try:
+            return [self.rotor_names.index(name) for name in names.split()]
+        except ValueError:
+            raise ValueError('invalid rotor: that rotor is not in the batch pool')
+
+    def reflector_index(self, name):
+        try:
+            return self.reflector_names.index(name)
+        except ValueError:
+            raise ValueError('invalid reflector: that reflector is not in the batch pool')
+
+    def encode(self, text, rotors, reflectors, rings, positions, plugboards=None):
+        # encodes text with every candidate in the batch and returns a (batch, len(text)) integer array
+        # @param - rotors - (batch, n) indices into rotor_names, leftmost rotor first as in create_enigma_machine
+        # @param - reflectors - (batch,) indices into reflector_names, or (batch, 26) reflector wiring tables
+        # @param - rings - (batch, n) ring settings numbered 1-26
+        # @param - positions - (batch, n) starting positions numbered 0-25
+        # @param - plugboards - (batch, 26) plugboard tables (see plugboard_table), default is no leads
+        rotors = np.asarray(rotors, dtype=np.int64)
+        positions = np.array(positions, dtype=np.int64) % 26
+        rings = np.asarray(rings, dtype=np.int64)
+        reflectors = np.asarray(reflectors, dtype=np.int64)
+        if rotors.ndim != 2 or rotors.shape[1] not in (3, 4):
+            raise ValueError('invalid batch: each candidate needs three or four rotors')
+        if positions.shape != rotors.shape or rings.shape != rotors.shape:
+            raise ValueError('partial ring or position values provided for rotors')
+        batch, count = rotors.shape
+        rows = np.arange(batch)
+        if reflectors.ndim == 1:
+            reflectors = self.reflectors[reflectors]
+        if plugboards is None:
+            plugboards = np.broadcast_to(np.arange(26), (batch, 26))
+        else:
+            plugboards = np.asarray(plugboards, dtype=np.int64)
+        characters = text_to_array(text)
+        output = np.empty((batch, len(characters)), dtype=np.int64)
+        right, middle, left = count - 1, count - 2, count - 3
+        for index, character in enumerate(characters):
+            # turns rotors at the start of every key press, matching EnigmaMachine.advance_rotors
+            # (the middle rotor moves twice if both it and the first rotor are on their notches)
+            first_notch = self.notches[rotors[:, right], positions[:, right]]
+            second_notch = self.notches[rotors[:, middle], positions[:, middle]]
+            positions[:, right] += 1
+            positions[:, middle] += first_notch
+            positions[:, middle] += second_notch
+            positions[:, left] += second_notch
+            positions %= 26
+            offsets = (positions - (rings - 1)) % 26
+            # values passed from plugboard through rotors and reflector and back again
+            values = plugboards[rows, character]
+            for n in range(count - 1, -1, -1):
+                values = (self.forward[rotors[:, n], (values + offsets[:, n]) % 26] - offsets[:, n]) % 26
+            values = reflectors[rows, values]
+            for n in range(0, count):
+                values = (self.backward[rotors[:, n], (values + offsets[:, n]) % 26] - offsets[:, n]) % 26
+            output[:, index] = plugboards[rows, values]
+        return output
+
+    def decode_texts(self, text, *settings, **keyword_settings):
+        # same as encode but returns a list of strings, one for each candidate
+        return array_to_texts(self.encode(text, *settings, **keyword_settings))
+
+    def crib_mask(self, text, crib, *settings, **keyword_settings):
+        # returns a boolean array which is true for each candidate whose decoded text contains the crib
+        return contains_crib(self.encode(text, *settings, **keyword_settings), crib)
+
+
+# method which returns an integer plugboard table for a list of plugboard pairs e.g. ["AB", "CD"]
+def plugboard_table(plugboard_pairs):
+    plugboard = Plugboard()
+    for pair in plugboard_pairs:
+        plugboard.add(PlugLead(pair))
+    return plugboard.table
+
+# method which converts a string of A-Z into an integer array
+def text_to_array(text):
+    values = np.frombuffer(text.encode("ascii"), dtype=np.uint8).astype(np.int64) - 65
+    if len(values) and (values.min() < 0 or values.max() > 25):
+        raise ValueError('rotor error: character not in rotor')
+    return values
+
+# method which converts a (batch, length) integer array back into a list of strings
+def array_to_texts(values):
+    letters = (np.asarray(values) + 65).astype(np.uint8)
+    return [row.tobytes().decode("ascii") for row in letters]
+
+# method which returns a boolean array, true for each row of the integer array which contains the crib
+def contains_crib(values, crib):
+    crib = text_to_array(crib)
+    if len(crib) == 0:
+        return np.ones(len(values), dtype=bool)
+    if len(crib) > values.shape[1]:
+        return np.zeros(len(values), dtype=bool)
+    windows = np.lib.stride_tricks.sliding_window_view(values, len(crib), axis=1)
+    return (windows == crib).all(axis=2).any(axis=1)
+
+# method which finds every starting position where the decoded code contains the crib, like code_two
+# returns a list of (initial positions, plaintext) pairs
+def search_positions(rotors, reflector, ring_settings, plugboard_pairs, code, crib):
+    engine = BatchEnigma(rotors.split(), [reflector])
+    count = len(rotors.split())
+    positions = np.array(list(product(range(26), repeat=count)), dtype=np.int64)
+    batch = len(positions)
+    rotor_rows = np.tile(engine.rotor_index(rotors), (batch, 1))
+    ring_rows = np.tile([int(ring) for ring in ring_settings.split()], (batch, 1))
+    plugboards = np.tile(plugboard_table(plugboard_pairs), (batch, 1))
+    output = engine.encode(code, rotor_rows, np.zeros(batch, dtype=np.int64), ring_rows, positions, plugboards)
+    hits = np.flatnonzero(contains_crib(output, crib))
+    texts = array_to_texts(output[hits])
+    return [(" ".join(chr(value + 65) for value in positions[hit]), text) for hit, text in zip(hits, texts)]
@@ -0,0 +1,116 @@
+import json
+import os
+import random
+import sys
+import timeit
+import enigma_code
+import enigma_search
+from enigma_code import *
+# Benchmarks of the hot paths, written as JSON so a run can be compared against a stored baseline.
+# Each result is a dictionary of its value and unit, units ending in "/sec" are better when higher and
+# times in "seconds" are better when lower.
+
+# results and the baseline are both kept next to this file, wherever the benchmarks are run from
+BENCHMARK_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(BENCHMARK_DIRECTORY, "benchmark_baseline.json")
+RESULTS_PATH = os.path.join(BENCHMARK_DIRECTORY, "benchmark_results.json")
+
+# method which returns the best time in seconds of repeat runs of a function
+def best_time(function, repeat=3):
+    times = []
+    for x in range(0, repeat):
+        start = timeit.default_timer()
+        function()
+        times.append(timeit.default_timer() - start)
+    return min(times)
+
+# method which measures how many characters a single machine encodes per second
+# @param - length - number of random letters encoded in each run
+def benchmark_encode(rotors, reflector, ring_settings, initial_positions, plugboard_pairs=[], length=100000, repeat=3):
+    generator = random.Random(0)
+    text = "".join(generator.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ") for x in range(length))
+    enigma = create_enigma_machine(rotors, reflector, ring_settings, initial_positions, plugboard_pairs)
+    def run():
+        enigma.set_positions(initial_positions)
+        enigma.encode(text)
+    return {"value": length / best_time(run, repeat), "unit": "chars/sec"}
+
+# method which measures how many machines create_enigma_machine builds per second
+def benchmark_construction(number=2000, repeat=3):
+    def run():
+        for x in range(0, number):
+            create_enigma_machine("Beta I III", "B", "23 02 10", "M J M", ["VH", "PT", "ZG", "BJ", "EY", "FS"])
+    return {"value": number / best_time(run, repeat), "unit": "machines/sec"}
+
+# method which measures how long one of the code breaking functions of enigma_code takes
+# @param - name - e.g. "code_one"
+def benchmark_code(name, repeat=1):
+    return {"value": best_time(getattr(enigma_code, name), repeat), "unit": "seconds"}
+
+# method which measures how many candidates of a code search are checked per second in this process
+# @param - code_search - e.g. enigma_search.code_three_search
+# @param - candidates - number of candidates from the start of the space that are checked
+def benchmark_search(code_search, candidates=5000, repeat=3):
+    space, code, crib = code_search()
+    stop = min(candidates, len(space))
+    def run():
+        enigma_search.search_shard(space, code, crib, 0, stop)
+    return {"value": stop / best_time(run, repeat), "unit": "candidates/sec"}
+
+# method which runs every benchmark and returns a dictionary of results by name
+# @param - codes - names of the code breaking functions to time, code_three takes the longest
+def run_benchmarks(codes=("code_one", "code_two", "code_three", "code_four", "code_five")):
+    results = {
+        "encode_3_rotor": benchmark_encode("I II III", "B", "01 01 01", "A A Z", ["HL", "MO", "AJ", "CX", "BZ"]),
+        "encode_4_rotor": benchmark_encode("Beta IV V I", "C", "07 11 15 19", "Q E V Z", ["PC", "XZ", "FM", "QA"]),
+        "create_enigma_machine": benchmark_construction(),
+    }
+    for name in codes:
+        results[name] = benchmark_code(name)
+    for name in ("code_two_search", "code_three_search", "code_five_search"):
+        results[name] = benchmark_search(getattr(enigma_search, name))
+    return results
+
+# method which returns a list of the results which are more than tolerance (a fraction) worse than the baseline
+# each regression is a dictionary of the name, baseline value, new value and how much worse it is
+def compare_benchmarks(results, baseline, tolerance=0.2):
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline or baseline[name]["unit"] != result["unit"]:
+            continue
+        old, new = baseline[name]["value"], result["value"]
+        if result["unit"] == "seconds":
+            change = (new - old) / old
+        else:
+            change = (old - new) / old
+        if change > tolerance:
+            regressions.append({"name": name, "baseline": old, "value": new, "worse_by": change})
+    return regressions
+
+def save_results(results, path):
+    with open(path, "w") as file:
+        json.dump(results, file, indent=2, sort_keys=True)
+
+def load_results(path):
+    with open(path) as file:
+        return json.load(file)
+
+
+if __name__ == "__main__":
+    # runs every benchmark, writes benchmark_results.json and compares it against benchmark_baseline.json,
+    # both next to this file
+    # the first run on a machine has no baseline to compare against, so its results become the baseline
+    results = run_benchmarks()
+    save_results(results, RESULTS_PATH)
+    for name, result in sorted(results.items()):
+        print("%-24s %12.4g %s" % (name, result["value"], result["unit"]))
+    if not os.path.exists(BASELINE_PATH):
+        save_results(results, BASELINE_PATH)
+        print("saved baseline to", BASELINE_PATH)
+    else:
+        regressions = compare_benchmarks(results, load_results(BASELINE_PATH))
+        for regression in regressions:
+            print("regression: %s is %.0f%% worse than the baseline" % (regression["name"], regression["worse_by"] * 100))
+        if regressions:
+            sys.exit(1)
+        print("no regressions against", BASELINE_PATH)
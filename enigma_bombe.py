@@ -0,0 +1,156 @@
+from itertools import product
+from enigma_code import *
+from enigma_search import crib_offsets
+# Emulator of the Turing-Welchman Bombe, which finds rotor settings and plugboard leads from a crib
+# without trying each plugboard. Letters are handled as integers (0 = A ... 25 = Z).
+
+# bit set with all 26 values of a letter lit
+ALL_LIT = (1 << 26) - 1
+
+class Menu:
+    # the letter graph made by lining a crib up against the code at an offset, every crib letter and the
+    # code letter under it are joined by an edge labelled with the position of the key press
+    def __init__(self, code, crib, offset=0):
+        if offset < 0 or offset + len(crib) > len(code):
+            raise ValueError('invalid menu: crib does not fit in the code at that offset')
+        self.edges = []
+        for x in range(0, len(crib)):
+            if crib[x] == code[offset + x]:
+                raise ValueError('invalid menu: a letter cannot be encoded to itself')
+            self.edges.append((ord(crib[x]) - 65, ord(code[offset + x]) - 65, offset + x))
+        self.letters = sorted(set([edge[0] for edge in self.edges] + [edge[1] for edge in self.edges]))
+        # the central letter has the most connections, it is where the bombe's test register is
+        self.central_letter = max(self.letters, key=lambda letter: (self.connections(letter), -letter))
+
+    def connections(self, letter):
+        return len([edge for edge in self.edges if letter in edge[:2]])
+
+    def loops(self):
+        # returns the number of independent loops in the menu (edges - letters + separate parts)
+        # each loop is a check the wrong settings have to pass, so more loops mean fewer false stops
+        parent = {letter: letter for letter in self.letters}
+        def find(letter):
+            while parent[letter] != letter:
+                letter = parent[letter]
+            return letter
+        for first, second, position in self.edges:
+            parent[find(first)] = find(second)
+        parts = len(set(find(letter) for letter in self.letters))
+        return len(self.edges) - len(self.letters) + parts
+
+
+class Bombe:
+    # runs the scramblers of a menu for every rotor order and starting position it is given
+    # @param - reflector - reflector name e.g. "B"
+    # @param - ring_settings - ring settings assumed for the rotors, default "01 01 01"
+    def __init__(self, menu, reflector, ring_settings="01 01 01"):
+        self.menu = menu
+        self.reflector = reflector
+        self.ring_settings = ring_settings
+        # key presses needed to reach the last edge of the menu
+        self.length = max([edge[2] for edge in menu.edges]) + 1
+        # nearby starting positions pass through the same rotor states, so scramblers are shared
+        self.cache = SubstitutionCache(20000)
+
+    def scramblers(self, rotors, initial_positions):
+        # returns the substitution made by the rotors and reflector (no plugboard) at each menu position
+        # the machine steps exactly as when encoding, including the middle rotor's double step
+        enigma = create_enigma_machine(rotors, self.reflector, self.ring_settings, initial_positions)
+        tables = []
+        for x in range(0, self.length):
+            enigma.advance_rotors()
+            tables.append(self.cache.get(enigma))
+        return [tables[position] for first, second, position in self.menu.edges]
+
+    def connect(self, scramblers):
+        # returns for each letter the menu letters joined to it and the scrambler between them
+        # the scrambler is its own inverse, so each edge can be followed in either direction
+        adjacent = [[] for x in range(26)]
+        for (first, second, position), table in zip(self.menu.edges, scramblers):
+            adjacent[first].append((second, table))
+            adjacent[second].append((first, table))
+        return adjacent
+
+    def propagate(self, adjacent, letter, value):
+        # assumes the plugboard connects letter to value and follows it round the menu to a fixed point
+        # live[x] is a bit set of the values letter x could be connected to under that assumption
+        # the diagonal board adds y -> x whenever x -> y, as plugboard leads connect both ways
+        # stops early once every value of the test letter is lit, as the assumption is then disproved
+        live = [0] * 26
+        live[letter] = 1 << value
+        waiting = [(letter, value)]
+        while waiting:
+            x, y = waiting.pop()
+            if not live[y] & (1 << x):
+                live[y] |= 1 << x
+                waiting.append((y, x))
+            for neighbour, table in adjacent[x]:
+                z = table[y]
+                if not live[neighbour] & (1 << z):
+                    live[neighbour] |= 1 << z
+                    waiting.append((neighbour, z))
+            if live[letter] == ALL_LIT:
+                break
+        return live
+
+    def test_position(self, rotors, initial_positions):
+        # returns a list of stops at this setting, each a list of deduced plugboard pairs
+        adjacent = self.connect(self.scramblers(rotors, initial_positions))
+        letter = self.menu.central_letter
+        live = self.propagate(adjacent, letter, 0)
+        lit = bin(live[letter]).count("1")
+        if live[letter] == ALL_LIT:
+            # every possible lead contradicts itself so the machine runs on
+            return []
+        if lit == 1:
+            candidates = [0]
+        else:
+            # the assumption was wrong but any value left unlit could still be right
+            candidates = [value for value in range(26) if not live[letter] & (1 << value)]
+        stops = []
+        for value in candidates:
+            if value != 0:
+                live = self.propagate(adjacent, letter, value)
+            steckers = self.steckers(live)
+            if steckers is not None:
+                stops.append(steckers)
+        return stops
+
+    def steckers(self, live):
+        # returns the plugboard pairs deduced for the menu's letters, or None if any letter has two leads
+        # letters in a separate part of the menu from the test register are never reached, so are skipped
+        pairs = set()
+        for letter in self.menu.letters:
+            if live[letter] == 0:
+                continue
+            if bin(live[letter]).count("1") != 1:
+                return None
+            value = live[letter].bit_length() - 1
+            # the letter it is connected to must also have only one lead, back to this letter
+            if live[value] != 1 << letter:
+                return None
+            if value != letter:
+                pairs.add(chr(min(letter, value) + 65) + chr(max(letter, value) + 65))
+        return sorted(pairs)
+
+    def run(self, rotor_orders, initial_positions=None):
+        # yields a stop dictionary for every setting the bombe stops at
+        # @param - rotor_orders - list of rotors e.g. ["I II III", "Beta I III"]
+        # @param - initial_positions - list of starting positions to test, default is every position
+        for rotors in rotor_orders:
+            if initial_positions is None:
+                positions = map(" ".join, product('ABCDEFGHIJKLMNOPQRSTUVWXYZ', repeat=len(rotors.split())))
+            else:
+                positions = initial_positions
+            for position in positions:
+                for steckers in self.test_position(rotors, position):
+                    yield {"rotors": rotors, "reflector": self.reflector, "ring_settings": self.ring_settings,
+                           "initial_positions": position, "steckers": steckers}
+
+
+# method which returns the menu with the most loops out of every place the crib could be in the code
+def best_menu(code, crib):
+    offsets = crib_offsets(code, crib)
+    if not offsets:
+        raise ValueError('invalid menu: the crib cannot be anywhere in the code')
+    return max([Menu(code, crib, offset) for offset in offsets], key=lambda menu: menu.loops())
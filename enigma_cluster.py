@@ -0,0 +1,244 @@
+import asyncio
+from collections import deque
+import json
+import multiprocessing
+import os
+import socket
+import sys
+import time
+import timeit
+from enigma_search import code_search_from_name, space_from_spec, search_shard
+# Coordinator and workers for searches too big for one machine. The coordinator splits a search into
+# shards and hands them out over TCP, workers on any machine search them and report their matches and
+# speed, and a shard is given to another worker if its worker disconnects or takes too long.
+# Messages are lines of JSON. A worker sends {"type": "hello", "name": ...} and is sent the search as
+# {"type": "job", "search": <space_from_spec description>, "code": ..., "crib": ...}, then asks for work
+# with {"type": "request"} or {"type": "result", "shard": n, "matches": [...], "seconds": t} and is
+# answered with {"type": "shard", "shard": n, "start": i, "stop": j}, {"type": "wait", "seconds": t}
+# while the last shards are still out, or {"type": "finished"}.
+
+class Coordinator:
+    # @param - search - description of the space, see enigma_search.space_from_spec, or {"code_search": name}
+    # to run one of enigma_search's code searches
+    # @param - code, crib - not needed with a code search
+    # @param - shard_size - candidates in each shard handed out
+    # @param - timeout - seconds a worker has to finish a shard before it is handed to another worker
+    def __init__(self, search, code=None, crib=None, shard_size=1000, timeout=600):
+        if "code_search" in search:
+            space, code, crib = code_search_from_name(search["code_search"])()
+        else:
+            space = space_from_spec(search)
+        self.search = search
+        self.code = code
+        self.crib = crib
+        # each shard's bounds are worked out from its number, so a search of any size costs the same to start
+        self.shards = space.shards(shard_size)
+        self.timeout = timeout
+        # shards are handed out in order from this number, before any handed back by a dead or slow worker
+        self.next_number = 0
+        self.requeued = deque()
+        # shard number -> (worker name, time it was handed out)
+        self.assigned = {}
+        # one bit per shard, set when its matches have been recorded
+        self.finished = bytearray((len(self.shards) + 7) // 8)
+        self.finished_count = 0
+        self.matches = []
+        # worker name -> {"shards": n, "candidates": n, "seconds": s}
+        self.workers = {}
+        self.done = asyncio.Event()
+        self.server = None
+        # workers still connected, which are told the search is finished before the coordinator stops
+        self.connections = 0
+        self.disconnected = asyncio.Event()
+        self.writers = set()
+
+    async def start(self, host="127.0.0.1", port=8766):
+        self.server = await asyncio.start_server(self.handle, host, port)
+        if not self.shards:
+            self.done.set()
+        return self.server
+
+    async def run(self, host="127.0.0.1", port=8766):
+        # serves workers until every shard is finished and returns the matches in the order of the space
+        if self.server is None:
+            await self.start(host, port)
+        await self.done.wait()
+        # gives waiting workers time to ask for more work and be told the search is finished
+        try:
+            await asyncio.wait_for(self.disconnected.wait(), 5.0)
+        except asyncio.TimeoutError:
+            pass
+        await self.close()
+        return sorted(self.matches, key=lambda match: match["index"])
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            # workers still connected are disconnected so their handlers finish rather than being cancelled
+            for writer in list(self.writers):
+                writer.close()
+            if self.connections:
+                await self.disconnected.wait()
+            await self.server.wait_closed()
+            self.server = None
+
+    def progress(self):
+        # returns the number of finished shards, all shards, and each worker's candidates per second
+        speeds = {name: worker["candidates"] / worker["seconds"] if worker["seconds"] else 0.0
+                  for name, worker in self.workers.items()}
+        return {"finished": self.finished_count, "shards": len(self.shards), "workers": speeds}
+
+    def is_finished(self, number):
+        return self.finished[number >> 3] & (1 << (number & 7))
+
+    def next_shard(self, name):
+        # hands out the next waiting shard, taking back any shard which has been out for longer than the timeout
+        now = timeit.default_timer()
+        for number, (owner, started) in list(self.assigned.items()):
+            if now - started > self.timeout:
+                del self.assigned[number]
+                self.requeued.append(number)
+        while self.requeued:
+            number = self.requeued.popleft()
+            if not self.is_finished(number):
+                return self.hand_out(number, name, now)
+        if self.next_number < len(self.shards):
+            self.next_number += 1
+            return self.hand_out(self.next_number - 1, name, now)
+        if self.finished_count == len(self.shards):
+            return {"type": "finished"}
+        return {"type": "wait", "seconds": 1.0}
+
+    def hand_out(self, number, name, now):
+        self.assigned[number] = (name, now)
+        start, stop = self.shards[number]
+        return {"type": "shard", "shard": number, "start": start, "stop": stop}
+
+    def record(self, name, message):
+        number = message["shard"]
+        self.assigned.pop(number, None)
+        worker = self.workers[name]
+        # a shard handed out twice is only counted once
+        if 0 <= number < len(self.shards) and not self.is_finished(number):
+            self.finished[number >> 3] |= 1 << (number & 7)
+            self.finished_count += 1
+            self.matches.extend(message["matches"])
+            start, stop = self.shards[number]
+            worker["shards"] += 1
+            worker["candidates"] += stop - start
+            worker["seconds"] += message.get("seconds", 0.0)
+            if self.finished_count == len(self.shards):
+                self.done.set()
+
+    def release(self, name):
+        # hands the shards of a disconnected worker to the others
+        for number, (owner, started) in list(self.assigned.items()):
+            if owner == name:
+                del self.assigned[number]
+                self.requeued.appendleft(number)
+
+    async def handle(self, reader, writer):
+        name = None
+        self.connections += 1
+        self.disconnected.clear()
+        self.writers.add(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                message = json.loads(line)
+                if message["type"] == "hello":
+                    name = message.get("name") or "%s:%s" % writer.get_extra_info("peername")[:2]
+                    # a worker reconnecting with the same name carries on with its totals
+                    self.workers.setdefault(name, {"shards": 0, "candidates": 0, "seconds": 0.0})
+                    response = {"type": "job", "search": self.search, "code": self.code, "crib": self.crib}
+                elif name is None:
+                    response = {"type": "error", "message": 'invalid message: hello must be sent first'}
+                else:
+                    if message["type"] == "result":
+                        self.record(name, message)
+                    response = self.next_shard(name)
+                writer.write((json.dumps(response) + "\n").encode("ascii"))
+                await writer.drain()
+        except (ConnectionError, ValueError, KeyError):
+            pass
+        except asyncio.CancelledError:
+            # cancelled with this worker still connected, its shard is handed back below
+            raise
+        finally:
+            if name is not None:
+                self.release(name)
+            self.writers.discard(writer)
+            writer.close()
+            self.connections -= 1
+            if self.connections == 0:
+                self.disconnected.set()
+
+
+# method which connects to a coordinator and searches the shards it hands out until the search is finished
+# @param - name - name the coordinator reports this worker's speed under, default is host name and process id
+def run_worker(host="127.0.0.1", port=8766, name=None):
+    if name is None:
+        name = "%s-%d" % (socket.gethostname(), os.getpid())
+    with socket.create_connection((host, port)) as connection:
+        stream = connection.makefile("rw", encoding="ascii", newline="\n")
+        def send(message):
+            stream.write(json.dumps(message) + "\n")
+            stream.flush()
+            line = stream.readline()
+            if not line:
+                raise ConnectionError('coordinator closed the connection')
+            return json.loads(line)
+        job = send({"type": "hello", "name": name})
+        if "code_search" in job["search"]:
+            space, code, crib = code_search_from_name(job["search"]["code_search"])()
+        else:
+            space, code, crib = space_from_spec(job["search"]), job["code"], job["crib"]
+        response = send({"type": "request"})
+        while response["type"] != "finished":
+            if response["type"] == "wait":
+                time.sleep(response["seconds"])
+                response = send({"type": "request"})
+            elif response["type"] == "shard":
+                started = timeit.default_timer()
+                matches = search_shard(space, code, crib, response["start"], response["stop"])
+                response = send({"type": "result", "shard": response["shard"], "matches": matches,
+                                 "seconds": timeit.default_timer() - started})
+            else:
+                raise ValueError('invalid message from coordinator: ' + response.get("message", response["type"]))
+
+# method which starts worker processes on this machine, e.g. one per core, and returns them
+# they are spawned rather than forked so they do not hold on to the coordinator's listening socket
+def start_workers(host="127.0.0.1", port=8766, processes=None):
+    context = multiprocessing.get_context("spawn")
+    workers = []
+    for x in range(0, processes or os.cpu_count() or 1):
+        worker = context.Process(target=run_worker, args=(host, port))
+        worker.start()
+        workers.append(worker)
+    return workers
+
+# method which runs a coordinator with worker processes on this machine and returns the matches
+# more workers on other machines can join it with run_worker
+def run_cluster(search, code=None, crib=None, host="127.0.0.1", port=8766, processes=None, shard_size=1000, timeout=600):
+    workers = []
+    async def serve():
+        coordinator = Coordinator(search, code, crib, shard_size, timeout)
+        await coordinator.start(host, port)
+        workers.extend(start_workers(host, port, processes))
+        return await coordinator.run()
+    try:
+        return asyncio.run(serve())
+    finally:
+        # joined once the event loop has stopped, so waiting for them does not hold up the coordinator
+        for worker in workers:
+            worker.join(10)
+
+
+if __name__ == "__main__":
+    # python enigma_cluster.py HOST [PORT] joins the coordinator at HOST with one worker per core
+    host = sys.argv[1] if len(sys.argv) > 1 else "127.0.0.1"
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 8766
+    for worker in start_workers(host, port):
+        worker.join()
@@ -1,10 +1,20 @@
-from itertools import product
 from itertools import permutations
-from itertools import combinations
+from collections import OrderedDict
+from itertools import count
+import json
 import timeit
+from enigma_keyspace import Product, Permutations, Combinations
 # Part 1 : Classes and functions you must implement - refer to the jupyter notebook
 # You may need to write more classes, which can be done here or in separate files, you choose.
 
+# every distinct compiled wiring is given a small integer id so identical wirings share cache entries
+wiring_ids = {}
+# rewired reflectors are not added to wiring_ids, which would grow with every rewiring a search tries,
+# instead each rewiring is given a new negative id which is never reused
+rewired_ids = count(-1, -1)
+# translation table which leaves every byte as it is
+IDENTITY_BYTES = bytes(range(256))
+
 class PlugLead:
     def __init__(self, mapping):
         valid_mapping = self.validate_mapping(mapping)
@@ -42,6 +52,8 @@ class Plugboard:
     def __init__(self):
         self.used_characters = []
         self.plugboard_leads = []
+        self.table = list(range(26))
+        self.translation = IDENTITY_BYTES
         
     def add(self, lead):
         # assesses if plugboard already has 10 leads
@@ -54,9 +66,36 @@ class Plugboard:
                 self.plugboard_leads.append(lead)
                 self.used_characters.append(lead.get_mapping()[0])
                 self.used_characters.append(lead.get_mapping()[1])
+                self.compile_leads()
         else:
             raise ValueError('invalid plugboard: only 10 leads')
             
+    def clear(self):
+        # removes every lead so the plugboard can be reused
+        self.used_characters = []
+        self.plugboard_leads = []
+        self.compile_leads()
+            
+    def compile_leads(self):
+        # builds an integer lookup table (0 = A ... 25 = Z) of the whole plugboard
+        # only the first lead holding a character is used, matching encode
+        self.table = list(range(26))
+        assigned = set()
+        for lead in self.plugboard_leads:
+            first = ord(lead.get_mapping()[0]) - 65
+            second = ord(lead.get_mapping()[1]) - 65
+            if first not in assigned:
+                self.table[first] = second
+                assigned.add(first)
+            if second not in assigned:
+                self.table[second] = first
+                assigned.add(second)
+        # the same table for bytes, where the byte for each letter is its ASCII code
+        translation = bytearray(range(256))
+        for value in range(26):
+            translation[value + 65] = self.table[value] + 65
+        self.translation = bytes(translation)
+            
     def encode(self, character):
         # checks each lead in plugboard and returns encoded character
         for lead in self.plugboard_leads:
@@ -66,21 +105,38 @@ class Plugboard:
     
         
 class Reflector:
-    def __init__(self, mappings):
-        self.mappings = mappings
+    # mappings and tables may be shared by every reflector or rotor with the same wiring (see
+    # WiringRegistry), so they are never changed in place, rewiring gives this object its own copies
+    def __init__(self, mappings, compiled=None):
+        self.mappings = tuple(mappings)
+        if compiled is None:
+            compiled = compile_wiring(self.mappings)
+        self.tables, self.wiring_id = compiled
+        # kept so rewired mappings can be undone
+        self.original_mappings = self.mappings
+        self.original_compiled = compiled
         
     def get_mappings(self):
-        return self.mappings
+        return list(self.mappings)
     
     def set_mappings(self, new_mappings):
         # setter function for code five
         # replaces changed pairs in the reflectors mapping
-        for x in range (0, len(self.mappings)):
+        mappings = list(self.mappings)
+        for x in range (0, len(mappings)):
             for maps in new_mappings:
-                if maps[0] == self.mappings[x][0]:
-                    self.mappings[x] = maps
-                elif maps[0] == self.mappings[x][1]:
-                    self.mappings[x] = maps[1] + maps[0]
+                if maps[0] == mappings[x][0]:
+                    mappings[x] = maps
+                elif maps[0] == mappings[x][1]:
+                    mappings[x] = maps[1] + maps[0]
+        self.mappings = tuple(mappings)
+        # tables must be rebuilt as the mappings have changed
+        self.tables, self.wiring_id = compile_wiring(self.mappings, shared=False)
+        
+    def reset_mappings(self):
+        # undoes any changes made by set_mappings
+        self.mappings = self.original_mappings
+        self.tables, self.wiring_id = self.original_compiled
         
     def encode_right_to_left(self, character):
         # calls encode_rotor with '0' which indicates which direction to encode
@@ -92,40 +148,48 @@ class Reflector:
     
     def encode_rotor(self, map_value, character):
         # returns the mapped pair value of the character inputted
-        rotated_ascii = ord(character)
-        for maps in self.mappings:
-            if maps[map_value] == chr(rotated_ascii):
-                return maps[1-map_value]
-        return ValueError('rotor error: character not in rotor')
+        index = ord(character) - 65
+        if 0 <= index < 26:
+            value = self.tables[map_value][index]
+            if value is not None:
+                return chr(value + 65)
+        raise ValueError('rotor error: character not in rotor')
     
     
 class NotchlessRotor(Reflector):
-    def __init__(self, mappings):
-        self.mappings = mappings
-        self.position = "A" # default if not set
+    def __init__(self, mappings, compiled=None):
+        super().__init__(mappings, compiled)
         self.ring = "01" # default if not set
+        self.set_position("A") # default if not set
         
     def set_position(self, position):
         self.position = position
+        self.update_offset()
         
     def set_ring(self, ring):
         self.ring = ring
+        self.update_offset()
+        
+    def update_offset(self):
+        # the contact point is shifted by adding position setting and subtracting ring setting
+        # storing this as one integer means encoding does not have to convert the settings each key press
+        self.offset = (ord(self.position) - 65 - (int(self.ring) - 1)) % 26
         
     def encode_rotor(self, map_value, character):
-        # calculates the contact point by adding position setting and subtracting ring setting
-        rotated_ascii = self.validate_ascii(ord(character) + ord(self.position) - int(self.ring) - 64)   
-        for maps in self.mappings:
-            if maps[map_value] == chr(rotated_ascii):
-                # calculates the pin point by subtracting position setting and adding ring setting
-                value = self.validate_ascii(ord(maps[1-map_value]) - ord(self.position) + int(self.ring) + 64)
+        # calculates the contact point by adding the offset, then the pin point by subtracting it again
+        index = ord(character) - 65
+        if 0 <= index < 26:
+            value = self.tables[map_value][(index + self.offset) % 26]
+            if value is not None:
                 # returns encoded character
-                return chr(value)
-        return ValueError('rotor error: character not in rotor')
+                return chr((value - self.offset) % 26 + 65)
+        raise ValueError('rotor error: character not in rotor')
         
     def rotate_rotor(self):
         # adds one to position setting to rotate the rotor
         position = self.validate_ascii(ord(self.position) + 1)
         self.position = chr(position)
+        self.update_offset()
         
     def validate_ascii(self, value):
         # validates that the ascii value stays between 65 and 90 (upper case characters)
@@ -137,11 +201,9 @@ class NotchlessRotor(Reflector):
         
         
 class NotchRotor(NotchlessRotor):
-    def __init__(self, mappings, notch):
-        self.mappings = mappings
+    def __init__(self, mappings, notch, compiled=None):
+        super().__init__(mappings, compiled)
         self.notch = notch
-        self.position = "A" # default if not set
-        self.ring = "01" # default if not set
     
     def is_on_notch(self):
         # assesses if the rotor is currently on its notch and returns boolean
@@ -151,13 +213,296 @@ class NotchRotor(NotchlessRotor):
             return False
                
         
+# method which builds integer lookup tables (0 = A ... 25 = Z) from a list of mappings e.g. ["AE", "BK" ...]
+# returns (tables, wiring id), tables[0] is the right to left wiring and tables[1] is its inverse,
+# the left to right wiring, so encoding through a wiring is a single index
+# @param - shared - False for a wiring only one object uses, which gets an id of its own rather than being interned
+def compile_wiring(mappings, shared=True):
+    tables = [[None] * 26, [None] * 26]
+    for maps in mappings:
+        for map_value in (0, 1):
+            index = ord(maps[map_value]) - 65
+            # only the first pair for a character is used, matching a scan through the mappings
+            if tables[map_value][index] is None:
+                tables[map_value][index] = ord(maps[1-map_value]) - 65
+    tables = (tuple(tables[0]), tuple(tables[1]))
+    if not shared:
+        return tables, next(rewired_ids)
+    return tables, wiring_ids.setdefault(tables, len(wiring_ids))
+
+
+class WiringRegistry:
+    # named rotor and reflector wirings, each compiled once into tables which are shared by every rotor
+    # or reflector made from it, so making one only sets up its position and ring setting
+    # wirings are written as the 26 letters that A to Z are connected to e.g. "EKMFLGDQVZNTOWYHXUSPAIBRCJ"
+    def __init__(self):
+        self.rotors = {}
+        self.reflectors = {}
+        
+    def add_rotor(self, name, wiring, notch=""):
+        # @param - notch - letters of the positions the rotor turns the next rotor from, "" for none
+        mappings = self.wiring_mappings(wiring)
+        if not all('A' <= letter <= 'Z' for letter in notch):
+            raise ValueError('invalid rotor: notches must be upper case letters')
+        self.rotors[name] = (mappings, compile_wiring(mappings), notch)
+        
+    def add_reflector(self, name, wiring):
+        mappings = self.wiring_mappings(wiring)
+        # a reflector connects letters in 13 pairs, so no letter can go to itself
+        for maps in mappings:
+            if maps[0] == maps[1] or wiring[ord(maps[1]) - 65] != maps[0]:
+                raise ValueError('invalid reflector: letters must be connected in pairs')
+        self.reflectors[name] = (mappings, compile_wiring(mappings))
+        
+    def wiring_mappings(self, wiring):
+        # converts a wiring into mappings e.g. ("AE", "BK" ...) after checking every letter is used once
+        if sorted(wiring) != [chr(x + 65) for x in range(26)]:
+            raise ValueError('invalid wiring: must connect each letter A-Z to exactly one letter')
+        return tuple(chr(x + 65) + wiring[x] for x in range(26))
+    
+    def rotor_wiring(self, name):
+        # returns (mappings, compiled tables, notch) for a rotor name
+        if name not in self.rotors:
+            raise ValueError('invalid rotor: that is not a valid rotor name')
+        return self.rotors[name]
+    
+    def reflector_wiring(self, name):
+        # returns (mappings, compiled tables) for a reflector name
+        if name not in self.reflectors:
+            raise ValueError('invalid reflector: that is not a valid reflector name')
+        return self.reflectors[name]
+    
+    def load(self, path):
+        # adds the wirings in a JSON file, replacing any with the same names, in the form
+        # {"rotors": {"VI": {"wiring": "JPGVOUMFYQBENHZRDKASXLICTW", "notch": "ZM"}},
+        #  "reflectors": {"B-Thin": "ENKQAUYWJICOPBLMDXZVFTHRGS"}}
+        with open(path) as file:
+            data = json.load(file)
+        for name, rotor in data.get("rotors", {}).items():
+            self.add_rotor(name, rotor["wiring"], rotor.get("notch", ""))
+        for name, wiring in data.get("reflectors", {}).items():
+            self.add_reflector(name, wiring)
+            
+    def copy(self):
+        registry = WiringRegistry()
+        registry.rotors = dict(self.rotors)
+        registry.reflectors = dict(self.reflectors)
+        return registry
+    
+    
+# wirings of the standard rotors and reflectors, more can be added with wirings.load
+wirings = WiringRegistry()
+wirings.add_rotor("I", "EKMFLGDQVZNTOWYHXUSPAIBRCJ", "Q")
+wirings.add_rotor("II", "AJDKSIRUXBLHWTMCQGZNPYFVOE", "E")
+wirings.add_rotor("III", "BDFHJLCPRTXVZNYEIWGAKMUSQO", "V")
+wirings.add_rotor("IV", "ESOVPZJAYQUIRHXLNFTGKDCMWB", "J")
+wirings.add_rotor("V", "VZBRGITYUPSDNHLXAWMJQOFECK", "Z")
+wirings.add_rotor("Beta", "LEYJVCNIXWPBQMDRTAKZGFUHOS")
+wirings.add_rotor("Gamma", "FSOKANUERHMBTIYCWLQPZXVGJD")
+wirings.add_reflector("A", "EJMZALYXVBWFCRQUONTSPIKHGD")
+wirings.add_reflector("B", "YRUHQSLDPXNGOKMIEBFZCWVJAT")
+wirings.add_reflector("C", "FVPJIAOYEDRZXWGCTKUQSBNMHL")
+        
+        
+class SubstitutionCache:
+    # least recently used store of the 26 letter substitution made by the rotors and reflector in each state
+    # one cache can be shared by many machines, e.g. every machine built for the same day key
+    def __init__(self, maxsize=65536):
+        if maxsize < 1:
+            raise ValueError('invalid cache: size must be at least 1')
+        self.maxsize = maxsize
+        self.tables = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        
+    def get(self, machine):
+        # returns the substitution table for the machine's current state, building it on a miss
+        # state is the reflector and each rotor's wiring with its offset (position and ring setting combined)
+        key = (machine.reflector.wiring_id,) + tuple((rotor.wiring_id, rotor.offset) for rotor in machine.rotors)
+        table = self.tables.get(key)
+        if table is None:
+            self.misses += 1
+            table = machine.scrambler_table()
+            self.tables[key] = table
+            if len(self.tables) > self.maxsize:
+                # evicts the least recently used state
+                self.tables.popitem(last=False)
+        else:
+            self.hits += 1
+            self.tables.move_to_end(key)
+        return table
+    
+    def clear(self):
+        self.tables.clear()
+        self.hits = 0
+        self.misses = 0
+        
+        
+class SearchStats:
+    # opt-in record of where the time of a search goes, given to create_enigma_machine and the code_*
+    # functions with stats=... and left out (None) when not wanted, which costs nothing
+    # @param - progress - optional function called with this object every interval seconds while candidates are counted
+    def __init__(self, progress=None, interval=1.0):
+        self.candidates = 0
+        self.matches = 0
+        self.characters = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # seconds spent in each stage e.g. "construction", "stepping", "wiring", "crib check"
+        self.times = {}
+        # anything else found by a search e.g. the reflector of code_five
+        self.details = {}
+        self.progress = progress
+        self.interval = interval
+        self.start = timeit.default_timer()
+        self.last_progress = self.start
+
+    def timer(self):
+        return timeit.default_timer()
+
+    def add_time(self, stage, seconds):
+        self.times[stage] = self.times.get(stage, 0.0) + seconds
+
+    def count_candidate(self, matched=False):
+        self.candidates += 1
+        if matched:
+            self.matches += 1
+        # the clock is only read every 256 candidates to keep counting cheap
+        if self.progress is not None and self.candidates % 256 == 0:
+            self.report_progress()
+
+    def report_progress(self):
+        now = timeit.default_timer()
+        if self.progress is not None and now - self.last_progress >= self.interval:
+            self.last_progress = now
+            self.progress(self)
+
+    def elapsed(self):
+        return timeit.default_timer() - self.start
+
+    def merge(self, other):
+        # adds the counts and times of another SearchStats, e.g. one from a worker process
+        # the times of parallel workers are summed, so they can add up to more than the elapsed time
+        self.candidates += other.candidates
+        self.matches += other.matches
+        self.characters += other.characters
+        self.cache_hits += other.cache_hits
+        self.cache_misses += other.cache_misses
+        for stage, seconds in other.times.items():
+            self.add_time(stage, seconds)
+        self.details.update(other.details)
+        self.report_progress()
+
+    def as_dict(self):
+        return {"candidates": self.candidates, "matches": self.matches, "characters": self.characters,
+                "cache_hits": self.cache_hits, "cache_misses": self.cache_misses, "times": dict(self.times),
+                "elapsed": self.elapsed(), "details": dict(self.details)}
+
+    def __getstate__(self):
+        # the progress function stays in the process it was given in
+        state = dict(self.__dict__)
+        state["progress"] = None
+        return state
+
+    def report(self):
+        # returns a readable summary, one line per count or stage
+        lines = ["candidates: %d, matches: %d, characters encoded: %d" % (self.candidates, self.matches, self.characters)]
+        if self.cache_hits or self.cache_misses:
+            lines.append("cache hits: %d, misses: %d" % (self.cache_hits, self.cache_misses))
+        for stage, seconds in sorted(self.times.items(), key=lambda item: -item[1]):
+            lines.append("%s: %.4fs" % (stage, seconds))
+        for name, value in self.details.items():
+            lines.append("%s: %s" % (name, value))
+        lines.append("Time elapsed: %.4fs" % self.elapsed())
+        return "\n".join(lines)
+
+
 class EnigmaMachine:
-    def __init__(self, rotors, reflector, plugboard):
+    def __init__(self, rotors, reflector, plugboard, cache=None):
         self.rotors = rotors
         self.reflector = reflector
         self.plugboard = plugboard
+        # optional SubstitutionCache, without one every character goes through each rotor in turn
+        self.cache = cache
+        # rotors, reflectors and leads made while reconfiguring the machine, so each is only made once
+        self.rotor_pool = {}
+        self.reflector_pool = {}
+        self.lead_pool = {}
+        # optional SearchStats which encode records its stepping and wiring time and characters in
+        self.stats = None
+        
+    # The set methods reconfigure the machine in place so one machine can be reused for every
+    # candidate of a search. Settings are given in the same form as for create_enigma_machine.
+    
+    def set_rotors(self, rotors):
+        # swaps in rotors e.g. "I II III", set_rings and set_positions should be called afterwards
+        # as a rotor keeps the settings it last had in this machine
+        rotor_objects = []
+        for slot, name in enumerate(rotors.split()):
+            if (slot, name) not in self.rotor_pool:
+                self.rotor_pool[(slot, name)] = self.make_rotor(name)
+            rotor_objects.append(self.rotor_pool[(slot, name)])
+        self.rotors = rotor_objects
+        
+    def set_rings(self, ring_settings):
+        ring_settings = ring_settings.split()
+        if len(ring_settings) != len(self.rotors):
+            raise ValueError('partial ring or position values provided for rotors')
+        for rotor, ring in zip(self.rotors, ring_settings):
+            rotor.set_ring(ring)
+            
+    def set_positions(self, initial_positions):
+        initial_positions = initial_positions.split()
+        if len(initial_positions) != len(self.rotors):
+            raise ValueError('partial ring or position values provided for rotors')
+        for rotor, position in zip(self.rotors, initial_positions):
+            rotor.set_position(position)
+            
+    def set_reflector(self, reflector):
+        # swaps in a standard reflector e.g. "B", undoing any rewiring of it
+        if reflector not in self.reflector_pool:
+            self.reflector_pool[reflector] = self.make_reflector(reflector)
+        self.reflector = self.reflector_pool[reflector]
+        self.reflector.reset_mappings()
+        
+    def rewire_reflector(self, new_mappings):
+        # replaces pairs in the reflector's original wiring, see Reflector.set_mappings
+        self.reflector.reset_mappings()
+        self.reflector.set_mappings(new_mappings)
+        
+    def set_plugboard(self, plugboard_pairs):
+        # replaces every lead with the list of plugboard pairs e.g. ["AB", "CD"]
+        self.plugboard.clear()
+        for pair in plugboard_pairs:
+            if pair not in self.lead_pool:
+                self.lead_pool[pair] = self.make_lead(pair)
+            self.plugboard.add(self.lead_pool[pair])
+            
+    # the parts used when reconfiguring, which other versions of the machine can override
+    
+    def make_rotor(self, name):
+        return rotor_from_name(name)
+    
+    def make_reflector(self, name):
+        return reflector_from_name(name)
+    
+    def make_lead(self, pair):
+        return PlugLead(pair)
+            
+    def snapshot(self):
+        # returns the rotor positions, which is all that encoding changes
+        return tuple(rotor.position for rotor in self.rotors)
+    
+    def restore(self, snapshot):
+        # puts the rotors back to the positions of a snapshot
+        for rotor, position in zip(self.rotors, snapshot):
+            rotor.set_position(position)
         
     def encode(self,text):
+        if self.stats is not None:
+            return self.encode_instrumented(text)
+        if self.cache is not None:
+            return self.encode_cached(text)
         ciphertext = ""
         # loops for every character in provided text
         for character in text:
@@ -175,6 +520,151 @@ class EnigmaMachine:
             ciphertext += temp
         # returns final ciphertext
         return ciphertext
+    
+    def encode_instrumented(self, text):
+        # same as encode but times stepping and the wiring lookups separately in self.stats
+        stats = self.stats
+        plugboard_table = self.plugboard.table
+        if self.cache is not None:
+            hits, misses = self.cache.hits, self.cache.misses
+        stepping = 0.0
+        wiring = 0.0
+        ciphertext = []
+        for character in text:
+            started = stats.timer()
+            self.advance_rotors()
+            stepped = stats.timer()
+            index = ord(character) - 65
+            if not 0 <= index < 26:
+                raise ValueError('rotor error: character not in rotor')
+            if self.cache is not None:
+                value = plugboard_table[self.cache.get(self)[plugboard_table[index]]]
+            else:
+                value = self.encode_value(index, [rotor.offset for rotor in self.rotors])
+            ciphertext.append(chr(value + 65))
+            stepping += stepped - started
+            wiring += stats.timer() - stepped
+        stats.add_time("stepping", stepping)
+        stats.add_time("wiring", wiring)
+        stats.characters += len(text)
+        if self.cache is not None:
+            stats.cache_hits += self.cache.hits - hits
+            stats.cache_misses += self.cache.misses - misses
+        return "".join(ciphertext)
+    
+    def encode_stream(self, source, chunk_size=65536):
+        # yields the encoding of a file-like object or iterable of strings one chunk at a time
+        # the rotors carry on from one chunk to the next, so joining the chunks gives the same result as
+        # encoding all of the text at once, but only one chunk is held in memory
+        # bytes chunks (e.g. from a file opened in binary mode) are encoded as ASCII and yielded as bytes
+        if chunk_size < 1:
+            raise ValueError('invalid chunk size: must be at least 1')
+        if hasattr(source, "read"):
+            source = read_chunks(source, chunk_size)
+        for chunk in source:
+            if isinstance(chunk, (bytes, bytearray, memoryview)):
+                yield self.encode(bytes(chunk).decode("ascii")).encode("ascii")
+            else:
+                yield self.encode(chunk)
+                
+    def encode_file(self, source, destination, chunk_size=65536):
+        # encodes a file-like object into another one chunk at a time, see encode_stream
+        for chunk in self.encode_stream(source, chunk_size):
+            destination.write(chunk)
+    
+    def encode_bytes(self, data, out=None):
+        # encodes ASCII upper case letters given as bytes, bytearray or memoryview and returns the output buffer
+        # the whole input is checked before the rotors move, then bytes and bytearray input goes through the
+        # plugboard in one bytes.translate pass, a memoryview is read in place a byte at a time, and each
+        # result is written straight into the output
+        # @param - out - optional preallocated buffer (e.g. bytearray) to write the result into
+        view = memoryview(data).cast("B")
+        length = len(view)
+        if out is None:
+            out = bytearray(length)
+        elif len(out) < length:
+            raise ValueError('invalid buffer: output buffer is shorter than the input')
+        # min and max read the buffer in place, so checking it copies nothing
+        if length and not (65 <= min(view) and max(view) <= 90):
+            raise ValueError('rotor error: character not in rotor')
+        translation = self.plugboard.translation
+        if isinstance(data, (bytes, bytearray)):
+            source = data.translate(translation)
+            inbound = IDENTITY_BYTES
+        else:
+            source = view
+            inbound = translation
+        target = memoryview(out).cast("B")
+        reflector_table = self.reflector.tables[0]
+        right_to_left = self.rotors[::-1]
+        for index in range(0, length):
+            self.advance_rotors()
+            value = inbound[source[index]] - 65
+            if self.cache is not None:
+                value = self.cache.get(self)[value]
+            else:
+                for rotor in right_to_left:
+                    value = (rotor.tables[0][(value + rotor.offset) % 26] - rotor.offset) % 26
+                value = reflector_table[value]
+                for rotor in self.rotors:
+                    value = (rotor.tables[1][(value + rotor.offset) % 26] - rotor.offset) % 26
+            target[index] = translation[value + 65]
+        return out
+    
+    def encode_cached(self, text):
+        # same as encode but each state's substitution table comes from the cache
+        plugboard_table = self.plugboard.table
+        ciphertext = []
+        for character in text:
+            self.advance_rotors()
+            index = ord(character) - 65
+            if not 0 <= index < 26:
+                raise ValueError('rotor error: character not in rotor')
+            ciphertext.append(chr(plugboard_table[self.cache.get(self)[plugboard_table[index]]] + 65))
+        return "".join(ciphertext)
+        
+    def encode_value(self, value, offsets):
+        # encodes one character given as an integer (0 = A ... 25 = Z) with each rotor at the given offset
+        # the rotors themselves are not used or stepped, so any recorded state can be encoded directly
+        value = self.plugboard.table[value]
+        for n in range(len(self.rotors) - 1, -1, -1):
+            value = (self.rotors[n].tables[0][(value + offsets[n]) % 26] - offsets[n]) % 26
+        value = self.reflector.tables[0][value]
+        for n in range(0, len(self.rotors)):
+            value = (self.rotors[n].tables[1][(value + offsets[n]) % 26] - offsets[n]) % 26
+        return self.plugboard.table[value]
+        
+    def scrambler_sequence(self, length):
+        # steps the machine length times and returns the substitution made by the rotors and reflector
+        # at each key press, so a message can be decoded with any plugboard without stepping again
+        tables = []
+        for x in range(0, length):
+            self.advance_rotors()
+            if self.cache is None:
+                tables.append(self.scrambler_table())
+            else:
+                tables.append(self.cache.get(self))
+        return tables
+        
+    def scrambler_table(self):
+        # returns the substitution made by the rotors and reflector in their current positions
+        # as a list of integers, by passing all 26 contacts through each wiring at once
+        table = list(range(26))
+        try:
+            for n in range(len(self.rotors) - 1, -1, -1):
+                wiring = self.rotors[n].tables[0]
+                offset = self.rotors[n].offset
+                table = [(wiring[(value + offset) % 26] - offset) % 26 for value in table]
+            wiring = self.reflector.tables[0]
+            table = [wiring[value] for value in table]
+            for n in range(0, len(self.rotors)):
+                wiring = self.rotors[n].tables[1]
+                offset = self.rotors[n].offset
+                table = [(wiring[(value + offset) % 26] - offset) % 26 for value in table]
+        except TypeError:
+            # a contact with no wire leaves None in the table
+            raise ValueError('rotor error: character not in rotor')
+        return table
         
     def advance_rotors(self):
         first_notch = False
@@ -194,50 +684,79 @@ class EnigmaMachine:
         # even if there is a fourth rotor and third rotor is on its notch it will not turn
             
 
+class SteppingSchedule:
+    # the sequence of rotor positions a machine passes through from its current state
+    # stepping only depends on positions, so the sequence always ends in a repeating cycle, which is
+    # stored once so the positions for any character of any length of message can be looked up directly
+    def __init__(self, machine):
+        self.machine = machine
+        # the rotors the schedule is worked out for, a machine given other rotors steps differently
+        self.rotors = list(machine.rotors)
+        self.start = tuple(rotor.position for rotor in machine.rotors)
+        # states[n] is the rotor positions used to encode character n
+        self.states = []
+        seen = {}
+        # uses the machine's own advance_rotors so multiple notch rotors step exactly as they do when encoding
+        while True:
+            machine.advance_rotors()
+            state = tuple(rotor.position for rotor in machine.rotors)
+            if state in seen:
+                break
+            seen[state] = len(self.states)
+            self.states.append(state)
+        # characters from cycle_start onwards repeat every cycle_length key presses
+        self.cycle_start = seen[state]
+        self.cycle_length = len(self.states) - self.cycle_start
+        self.set_positions(self.start)
+        
+    def positions(self, index):
+        # returns the rotor positions used to encode the character at this index of the message
+        if index < 0:
+            raise ValueError('invalid index: message offsets start at 0')
+        if index >= self.cycle_start:
+            index = self.cycle_start + (index - self.cycle_start) % self.cycle_length
+        return self.states[index]
+    
+    def check_rotors(self):
+        # raises a ValueError if the machine's rotors have been swapped since the schedule was made
+        if len(self.machine.rotors) != len(self.rotors) or any(
+                rotor is not original for rotor, original in zip(self.machine.rotors, self.rotors)):
+            raise ValueError('invalid schedule: the machine has had its rotors changed, make a new schedule')
+    
+    def seek(self, index):
+        # sets the machine so that the next character it encodes is the character at this index
+        self.check_rotors()
+        if index == 0:
+            self.set_positions(self.start)
+        else:
+            self.set_positions(self.positions(index - 1))
+            
+    def encode_slice(self, text, start):
+        # encodes text as if it were found at offset start of a message, without encoding the characters before it
+        self.seek(start)
+        return self.machine.encode(text)
+    
+    def set_positions(self, positions):
+        for rotor, position in zip(self.machine.rotors, positions):
+            rotor.set_position(position)
+            
+
 # method which returns a Rotor object
 # @param - name - name of the Rotor e.g. I or Gamma
 def rotor_from_name(name):
-    notch = ""
-    if name == "I":
-        mappings = ["AE", "BK", "CM", "DF", "EL", "FG", "GD", "HQ", "IV", "JZ", "KN", "LT", "MO", "NW", "OY", "PH", "QX", "RU", "SS", "TP", "UA", "VI", "WB", "XR", "YC", "ZJ"]
-        notch = "Q"
-    elif name == "II":
-        mappings = ["AA", "BJ", "CD", "DK", "ES", "FI", "GR", "HU", "IX", "JB", "KL", "LH", "MW", "NT", "OM", "PC", "QQ", "RG", "SZ", "TN", "UP", "VY", "WF", "XV", "YO", "ZE"]
-        notch = "E"
-    elif name == "III":
-        mappings = ["AB", "BD", "CF", "DH", "EJ", "FL", "GC", "HP", "IR", "JT", "KX", "LV", "MZ", "NN", "OY", "PE", "QI", "RW", "SG", "TA", "UK", "VM", "WU", "XS", "YQ", "ZO"]
-        notch = "V"
-    elif name == "IV":
-        mappings = ["AE", "BS", "CO", "DV", "EP", "FZ", "GJ", "HA", "IY", "JQ", "KU", "LI", "MR", "NH", "OX", "PL", "QN", "RF", "ST", "TG", "UK", "VD", "WC", "XM", "YW", "ZB"]
-        notch = "J"
-    elif name == "V":
-        mappings = ["AV", "BZ", "CB", "DR", "EG", "FI", "GT", "HY", "IU", "JP", "KS", "LD", "MN", "NH", "OL", "PX", "QA", "RW", "SM", "TJ", "UQ", "VO", "WF", "XE", "YC", "ZK"]
-        notch = "Z"
-    elif name == "Beta":
-        mappings = ["AL", "BE", "CY", "DJ", "EV", "FC", "GN", "HI", "IX", "JW", "KP", "LB", "MQ", "NM", "OD", "PR", "QT", "RA", "SK", "TZ", "UG", "VF", "WU", "XH", "YO", "ZS"]
-    elif name == "Gamma":
-        mappings = ["AF", "BS", "CO", "DK", "EA", "FN", "GU", "HE", "IR", "JH", "KM", "LB", "MT", "NI", "OY", "PC", "QW", "RL", "SQ", "TP", "UZ", "VX", "WV", "XG", "YJ", "ZD"]
-    else:
-        raise ValueError('invalid rotor: that is not a valid rotor name')
+    mappings, compiled, notch = wirings.rotor_wiring(name)
     # creates object of different class depending on if it has a notch or not
     if notch == "":
-        rotor = NotchlessRotor(mappings)
+        rotor = NotchlessRotor(mappings, compiled)
     else:
-        rotor = NotchRotor(mappings, notch)
+        rotor = NotchRotor(mappings, notch, compiled)
     return rotor
 
 # method which returns a Reflector object
 # @param - name - name of the Reflector e.g. A
 def reflector_from_name(name):
-    if name == "A":
-        mappings = ["AE", "BJ", "CM", "DZ", "EA", "FL", "GY", "HX", "IV", "JB", "KW", "LF", "MC", "NR", "OQ", "PU", "QO", "RN", "ST", "TS", "UP", "VI", "WK", "XH", "YG", "ZD"]
-    elif name == "B":
-        mappings = ["AY", "BR", "CU", "DH", "EQ", "FS", "GL", "HD", "IP", "JX", "KN", "LG", "MO", "NK", "OM", "PI", "QE", "RB", "SF", "TZ", "UC", "VW", "WV", "XJ", "YA", "ZT"]
-    elif name == "C":
-        mappings = ["AF", "BV", "CP", "DJ", "EI", "FA", "GO", "HY", "IE", "JD", "KR", "LZ", "MX", "NW", "OG", "PC", "QT", "RK", "SU", "TQ", "US", "VB", "WN", "XM", "YH", "ZL"]
-    else:
-        raise ValueError('invalid reflector: that is not a valid reflector name')
-    reflector = Reflector(mappings)
+    mappings, compiled = wirings.reflector_wiring(name)
+    reflector = Reflector(mappings, compiled)
     return reflector
 
 # method with returns an fully set up enigma machine object
@@ -246,7 +765,11 @@ def reflector_from_name(name):
 # @param - ring_settings - string of the ring settings for the rotors, numbered from 01-26 e.g. "01 02 03"
 # @param - initial_positions - string of the starting positions of the rotors, from A-Z e.g. "A A Z"
 # @param - plugboard_pairs - list of the plugboard pairs to be used, default is an empty list
-def create_enigma_machine(rotors,reflector,ring_settings,initial_positions,plugboard_pairs=[]):
+# @param - cache - optional SubstitutionCache to store each rotor state's substitution in
+# @param - stats - optional SearchStats to record the construction time in, the machine then records its encoding too
+def create_enigma_machine(rotors,reflector,ring_settings,initial_positions,plugboard_pairs=[],cache=None,stats=None):
+    if stats is not None:
+        started = stats.timer()
     # make reflector object
     reflector_object = reflector_from_name(reflector)
     # make array of rotor objects
@@ -270,15 +793,37 @@ def create_enigma_machine(rotors,reflector,ring_settings,initial_positions,plugb
     for pair in plugboard_pairs:
         plugboard.add(PlugLead(pair))
     # create and return enigma machine
-    enigma = EnigmaMachine(rotor_objects, reflector_object, plugboard)
+    enigma = EnigmaMachine(rotor_objects, reflector_object, plugboard, cache)
+    if stats is not None:
+        enigma.stats = stats
+        stats.add_time("construction", stats.timer() - started)
     return enigma
+
+# method which returns whether the crib is in a decoded message, counting the candidate in stats if given
+def crib_found(crib, plaintext, stats=None):
+    if stats is None:
+        return crib in plaintext
+    started = stats.timer()
+    found = crib in plaintext
+    stats.add_time("crib check", stats.timer() - started)
+    stats.count_candidate(found)
+    return found
+        
+# method which yields chunks read from a file-like object until it runs out
+# @param - source - file-like object e.g. open("traffic.txt")
+# @param - chunk_size - number of characters (or bytes) read at a time
+def read_chunks(source, chunk_size):
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
         
 # Part 2 : functions to implement to demonstrate code breaking.
 # each function should return a list of all the possible answers
 # code_one provides an example of how you might declare variables and the return type
 
-def code_one():
-    start = timeit.default_timer()
+def code_one(stats=None):
     rotors = "Beta Gamma V"
     possible_reflectors = ["A", "B", "C"] # list of possible reflectors
     ring_settings = "04 02 14"
@@ -288,82 +833,78 @@ def code_one():
     code = "DMEXBMKYCVPNQBEDHXVPZGKMTFFBJRPJTLHLCHOTKOYXGGHZ"
     crib = "SECRETS"
     
+    enigma = create_enigma_machine(rotors, possible_reflectors[0], ring_settings, initial_positions, plugboard, stats=stats)
+    start_positions = enigma.snapshot()
     # iterates through each possible reflector
     for reflector in possible_reflectors:
-        # creates engima machine with current reflector
-        enigma = create_enigma_machine(rotors, reflector, ring_settings, initial_positions, plugboard)
+        # sets up the enigma machine with current reflector
+        enigma.set_reflector(reflector)
+        enigma.restore(start_positions)
         # decodes code
         plaintext = enigma.encode(code)
         # if crib in plaintext returned then add to list of possible messages
-        if crib in plaintext:
+        if crib_found(crib, plaintext, stats):
             possible_messages.append(plaintext)  
-    print(possible_messages)
-    end = timeit.default_timer()
-    print ("Time elapsed:", end - start)
     return possible_messages
 
-def code_two():
-    start = timeit.default_timer()
+def code_two(stats=None):
     rotors = "Beta I III"
     reflector = "B"
     ring_settings = "23 02 10"
-    # list of possible initial position combinations e.g. AAA, AAB ... ZZZ
-    initial_positions = list(map(" ".join, product('ABCDEFGHIJKLMNOPQRSTUVWXYZ', repeat=3)))
+    # lazy keyspace of possible initial position combinations e.g. A A A, A A B ... Z Z Z
+    initial_positions = Product('ABCDEFGHIJKLMNOPQRSTUVWXYZ', 3)
     plugboard = ["VH", "PT", "ZG", "BJ", "EY", "FS"]
     possible_messages = []
     code = "CMFSUPKNCBMUYEQVVDYKLRQZTPUFHSWWAKTUGXMPAMYAFITXIJKMH"
     crib = "UNIVERSITY"
     
+    enigma = create_enigma_machine(rotors, reflector, ring_settings, initial_positions[0], plugboard, stats=stats)
     # iterates through each possible initial position
     for initial_position in initial_positions:
-        # creates enigma machine with this position and decodes
-        enigma = create_enigma_machine(rotors, reflector, ring_settings, initial_position, plugboard)
+        # sets the enigma machine to this position and decodes
+        enigma.set_positions(initial_position)
         plaintext = enigma.encode(code)
         # if crib in plaintext returned then add to list of possible messages
-        if crib in plaintext:
+        if crib_found(crib, plaintext, stats):
             possible_messages.append(plaintext)  
-    print(possible_messages)
-    end = timeit.default_timer()
-    print ("Time elapsed:", end - start)
     return possible_messages
   
 
-def code_three():
-    start = timeit.default_timer()
+def code_three(stats=None):
     # list of accepted rotors
     possible_rotors_list = "Beta, Gamma, II, IV"
-    # list of all possible combinations of 3 accepted rotors
-    possible_rotors = list(map(" ".join, permutations(possible_rotors_list.split(", "), 3)))
+    # lazy keyspace of all possible combinations of 3 accepted rotors
+    possible_rotors = Permutations(possible_rotors_list.split(", "), 3)
     # list of possible reflectors
     possible_reflectors = ["A", "B", "C"]
     # list of accepted ring settings
     possible_rings_list = "02, 04, 06, 08, 20, 22, 24, 26"
-    # list of all possible combinations of 3 accepted ring settings
-    possible_ring_settings = list(map(" ".join, product(possible_rings_list.split(", "), repeat=3)))
+    # lazy keyspace of all possible combinations of 3 accepted ring settings
+    possible_ring_settings = Product(possible_rings_list.split(", "), 3)
     initial_position = "E M Y"
     plugboard = ["FH", "TS", "BE", "UQ", "KD", "AL"]
     possible_messages = []
     code = "ABSKJAKKMRITTNYURBJFWQGRSGNNYJSDRYLAPQWIAGKJYEPCTAGDCTHLCDRZRFZHKNRSDLNPFPEBVESHPY"
     crib = "THOUSANDS"
     
+    enigma = create_enigma_machine(possible_rotors[0], possible_reflectors[0], possible_ring_settings[0], initial_position, plugboard, stats=stats)
     # loops for every combination of reflector, rotors and ring settings
     for reflector in possible_reflectors:
+        enigma.set_reflector(reflector)
         for rotors in possible_rotors:
+            enigma.set_rotors(rotors)
             for ring_settings in possible_ring_settings:
-                # creates enigma machine and decodes
-                enigma = create_enigma_machine(rotors, reflector, ring_settings, initial_position, plugboard)
+                # sets up enigma machine and decodes
+                enigma.set_rings(ring_settings)
+                enigma.set_positions(initial_position)
                 plaintext = enigma.encode(code)
                 # if crib in plaintext returned then add to list of possible messages
-                if crib in plaintext:
+                if crib_found(crib, plaintext, stats):
                     possible_messages.append(plaintext)  
-    print(possible_messages)
-    end = timeit.default_timer()
-    print ("Time elapsed:", end - start)
     return possible_messages
       
     
-def code_four():
-    start = timeit.default_timer()
+def code_four(stats=None):
     rotors = "V III IV"
     reflector = "A"
     ring_settings = "24 12 10"
@@ -377,27 +918,25 @@ def code_four():
     code = "SDNTVTPHRBNWTLMZTQKZGADDQYPFNHBPNHCQGBGMZPZLUAVGDQVYRBFYYEIXQWVTHXGNW"
     crib = "TUTOR"
     
+    enigma = create_enigma_machine(rotors, reflector, ring_settings, initial_position, stats=stats)
     for pair in possible_pairs:
         # adds pairs to plugboard
         pair1 = "A" + pair[0]
         pair2 = "I" + pair[2]
         plugboard.append(pair1)
         plugboard.append(pair2)
-        # creates engima with these plugboard settings and decodes
-        enigma = create_enigma_machine(rotors, reflector, ring_settings, initial_position, plugboard)
+        # sets up engima with these plugboard settings and decodes
+        enigma.set_plugboard(plugboard)
+        enigma.set_positions(initial_position)
         plaintext = enigma.encode(code)
         # if crib in plaintext then add to possible message list
-        if crib in plaintext:
+        if crib_found(crib, plaintext, stats):
             possible_messages.append(plaintext)
         # removes added pairs from plugboard
         del plugboard[-2:]
-    print(possible_messages)  
-    end = timeit.default_timer()
-    print ("Time elapsed:", end - start)
     return possible_messages
 
-def code_five():
-    start = timeit.default_timer()
+def code_five(stats=None):
     rotors = "V II IV"
     possible_standard_reflectors = ["A", "B", "C"] # list of possible standard reflectors
     ring_settings = "06 18 07"
@@ -406,8 +945,10 @@ def code_five():
     possible_messages = []
     code = "HWREISXLGTTBYVXRCWWJAKZDTVZWKBDJPVQYNEQIOTIFX"
     crib = "INSTAGRAM"
+    enigma = create_enigma_machine(rotors, possible_standard_reflectors[0], ring_settings, initial_position, plugboard, stats=stats)
     
     for possible_reflector in possible_standard_reflectors:
+        enigma.set_reflector(possible_reflector)
         # creates reflector object
         reflector = reflector_from_name(possible_reflector)
         # removes duplicate reversed pairs from the reflector's mapping
@@ -415,12 +956,10 @@ def code_five():
         for x in range(0,13):
             reversed_pair = mapping[x][1] + mapping[x][0]
             mapping.remove(reversed_pair)
-        original_mappings = ", ".join(mapping)
-        # creates a list of all combinations of 4 pairs of maps e.g. [AY, BR, CU, DH]
-        select_pairs = list(map(" ".join, combinations(original_mappings.split(", "), 4)))
+        # lazy keyspace of all combinations of 4 pairs of maps e.g. (AY, BR, CU, DH)
+        select_pairs = Combinations(mapping, 4)
         # iterates through all 4 pair combinations
         for pairs in select_pairs:
-            pairs = pairs.split()
             # creates list of all possible combinations of pairs that can swap within the four pairs 
             # e.g. [[[AY, BR],[CU, DH]] , [[AY, DH],[BR,CU]] , [[AY, CU],[BR,DH]]]
             swapping_pairs = [[[pairs[0], pairs[1]], [pairs[2], pairs[3]]], [[pairs[0], pairs[3]], [pairs[1], pairs[2]]], [[pairs[0], pairs[2]], [pairs[1], pairs[3]]]]
@@ -438,21 +977,18 @@ def code_five():
                 pair3 = pair3[0] + pair4[1]
                 pair4 = pair4[0] + temp[1]
                 pairs_list = [pair1, pair2, pair3, pair4]
-                # creates enigma
-                enigma = create_enigma_machine(rotors, possible_reflector, ring_settings, initial_position, plugboard)
-                # edits mapping of reflector with wire swaps
-                enigma.reflector.set_mappings(pairs_list)
+                # edits mapping of reflector with wire swaps and resets the rotors
+                enigma.rewire_reflector(pairs_list)
+                enigma.set_positions(initial_position)
                 plaintext = enigma.encode(code)
                 # if crib in plaintext then add to possible messages and save current reflector and wire swaps
-                if crib in plaintext:
+                if crib_found(crib, plaintext, stats):
                     possible_messages.append(plaintext)
                     correct_reflector = possible_reflector
                     swapped_wires = pairs_list
-    end = timeit.default_timer()
-    print(possible_messages)
-    print("original reflector is :", correct_reflector)
-    print("swapped wires are :", swapped_wires)
-    print ("Time elapsed:", end - start)
+    if stats is not None:
+        stats.details["original reflector"] = correct_reflector
+        stats.details["swapped wires"] = swapped_wires
     return possible_messages
 
 if __name__ == "__main__":
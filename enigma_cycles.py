@@ -0,0 +1,106 @@
+import json
+from enigma_code import *
+from enigma_keyspace import Product, Permutations
+# Rejewski's characteristic method for doubled indicators. A message key enciphered twice gives six
+# letters, and the first and fourth (AD), second and fifth (BE) and third and sixth (CF) are joined by a
+# permutation of the alphabet. The lengths of the cycles of these permutations do not depend on the
+# plugboard, so a catalogue of them for every rotor order and starting position narrows a day key down to a
+# few settings. Letters are handled as integers (0 = A ... 25 = Z).
+
+# method which returns the cycle lengths of a permutation (a list where permutation[x] is where x goes),
+# longest first, or raises a ValueError if it is not a whole permutation
+def cycle_lengths(permutation):
+    if sorted(permutation) != list(range(len(permutation))):
+        raise ValueError('invalid permutation: every letter must appear exactly once')
+    seen = [False] * len(permutation)
+    lengths = []
+    for start in range(0, len(permutation)):
+        length = 0
+        letter = start
+        while not seen[letter]:
+            seen[letter] = True
+            letter = permutation[letter]
+            length += 1
+        if length:
+            lengths.append(length)
+    return tuple(sorted(lengths, reverse=True))
+
+# method which returns the characteristic of a machine at its current positions, the cycle lengths of
+# AD, BE and CF, stepping the machine six times
+def machine_characteristic(enigma):
+    tables = enigma.scrambler_sequence(6)
+    # each scrambler is its own inverse, so the letter enciphered to x at the first key press is tables[0][x]
+    return tuple(cycle_lengths([tables[x + 3][tables[x][letter]] for letter in range(26)]) for x in range(0, 3))
+
+# method which returns the characteristic of a day's traffic from its doubled indicators e.g. ["SYXSCW", ...]
+# enough indicators are needed for every letter to appear in each of the six places, usually about 80
+def indicator_characteristic(indicators):
+    permutations = [[None] * 26 for x in range(3)]
+    for indicator in indicators:
+        if len(indicator) != 6:
+            raise ValueError('invalid indicator: a doubled indicator has six letters')
+        for x in range(0, 3):
+            first, second = ord(indicator[x]) - 65, ord(indicator[x + 3]) - 65
+            if permutations[x][first] not in (None, second):
+                raise ValueError('invalid indicator: indicators disagree, they cannot be from one day key')
+            permutations[x][first] = second
+    if any(None in permutation for permutation in permutations):
+        raise ValueError('invalid indicators: not enough to know where every letter goes')
+    return tuple(cycle_lengths(permutation) for permutation in permutations)
+
+# method which returns the text used to store a characteristic e.g. "13 13/12 12 1 1/10 10 3 3"
+def characteristic_key(characteristic):
+    return "/".join(" ".join(str(length) for length in lengths) for lengths in characteristic)
+
+
+class CycleCatalogue:
+    # the starting positions of every rotor order grouped by their characteristic
+    # entries are stored as (rotor order number, position number) pairs, a position number being its index
+    # in Product of the alphabet (about 20 MB on disk for every order of three of five rotors)
+    # ring settings only move when the middle rotor turns over, so like the original catalogue one ring
+    # setting is assumed and a day key whose turnover falls within the six letters may be missed
+    def __init__(self, rotor_orders, reflector="B", ring_settings=None, entries=None):
+        self.rotor_orders = list(rotor_orders)
+        self.reflector = reflector
+        self.count = len(self.rotor_orders[0].split()) if self.rotor_orders else 3
+        self.ring_settings = ring_settings or " ".join(["01"] * self.count)
+        self.positions = Product('ABCDEFGHIJKLMNOPQRSTUVWXYZ', self.count)
+        # characteristic key -> list of [rotor order number, position number]
+        self.entries = entries if entries is not None else {}
+
+    def build(self):
+        # runs the machine of every rotor order from every starting position
+        for number, rotors in enumerate(self.rotor_orders):
+            # neighbouring positions share most of their rotor states, so their scramblers are cached
+            enigma = create_enigma_machine(rotors, self.reflector, self.ring_settings, self.positions[0],
+                                           cache=SubstitutionCache(2 * len(self.positions)))
+            for index, positions in enumerate(self.positions):
+                enigma.set_positions(positions)
+                key = characteristic_key(machine_characteristic(enigma))
+                self.entries.setdefault(key, []).append([number, index])
+        return self
+
+    def lookup(self, characteristic):
+        # returns the (rotors, starting positions) of every setting with this characteristic
+        # @param - characteristic - e.g. from indicator_characteristic, or its characteristic_key
+        key = characteristic if isinstance(characteristic, str) else characteristic_key(characteristic)
+        return [(self.rotor_orders[number], self.positions[index]) for number, index in self.entries.get(key, [])]
+
+    def save(self, path):
+        with open(path, "w") as file:
+            json.dump({"rotor_orders": self.rotor_orders, "reflector": self.reflector,
+                       "ring_settings": self.ring_settings, "entries": self.entries}, file)
+
+
+# method which reads a catalogue written by CycleCatalogue.save
+def load_catalogue(path):
+    with open(path) as file:
+        data = json.load(file)
+    return CycleCatalogue(data["rotor_orders"], data["reflector"], data["ring_settings"], data["entries"])
+
+# method which builds the catalogue of every order of count rotors from a pool and writes it to a file
+# @param - pool - rotor names e.g. ["I", "II", "III", "IV", "V"]
+def build_catalogue(pool, path, reflector="B", count=3):
+    catalogue = CycleCatalogue(Permutations(pool, count), reflector).build()
+    catalogue.save(path)
+    return catalogue
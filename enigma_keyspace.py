@@ -0,0 +1,158 @@
+from itertools import product
+from itertools import permutations
+from itertools import combinations
+from math import comb, perm
+# Lazy keyspaces: sequences of settings which work out the setting at any index when it is asked for
+# instead of holding every setting in a list, so memory stays the same however large the space is.
+# Each setting is identified by its index, a single integer, which is all that has to be stored or sent
+# to a worker, and a keyspace can be split into contiguous ranges of indices to share out work.
+
+class Keyspace:
+    # subclasses set self.size and implement decode(index) for 0 <= index < size
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        # returns the setting at an index (negative indices count from the end) or a KeyRange for a slice
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.size)
+            if step != 1:
+                raise ValueError('invalid slice: keyspaces can only be sliced into contiguous ranges')
+            return KeyRange(self, start, max(start, stop))
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError('keyspace index out of range')
+        return self.decode(index)
+
+    def __iter__(self):
+        for index in range(0, self.size):
+            yield self.decode(index)
+
+    def __add__(self, other):
+        return Chain(self, other)
+
+    def split(self, parts):
+        # returns parts contiguous KeyRanges of as equal a length as possible, which together cover the space
+        if parts < 1:
+            raise ValueError('invalid split: must be at least 1 part')
+        bounds = [self.size * part // parts for part in range(0, parts + 1)]
+        return [KeyRange(self, bounds[part], bounds[part + 1]) for part in range(0, parts)]
+
+    def ranges(self, size):
+        # returns contiguous KeyRanges of at most size settings
+        if size < 1:
+            raise ValueError('invalid range size: must be at least 1')
+        return [KeyRange(self, start, min(start + size, self.size)) for start in range(0, self.size, size)]
+
+
+class KeyRange(Keyspace):
+    # the settings of a keyspace from index start up to but not including stop
+    def __init__(self, keyspace, start, stop):
+        if not 0 <= start <= stop <= len(keyspace):
+            raise IndexError('keyspace range out of range')
+        self.keyspace = keyspace
+        self.start = start
+        self.stop = stop
+        self.size = stop - start
+
+    def decode(self, index):
+        return self.keyspace.decode(self.start + index)
+
+
+class Product(Keyspace):
+    # every choice of count values from a list, in the order of itertools.product e.g. "A A A" ... "Z Z Z"
+    # @param - separator - string the values of a setting are joined with, or None for tuples
+    def __init__(self, values, count=3, separator=" "):
+        self.values = list(values)
+        self.count = count
+        self.separator = separator
+        self.size = len(self.values) ** count
+
+    def digits(self, index):
+        # returns the position in values of each part of the setting at an index
+        digits = []
+        for x in range(0, self.count):
+            index, digit = divmod(index, len(self.values))
+            digits.append(digit)
+        return digits[::-1]
+
+    def decode(self, index):
+        setting = tuple(self.values[digit] for digit in self.digits(index))
+        return setting if self.separator is None else self.separator.join(setting)
+
+    def __iter__(self):
+        settings = product(self.values, repeat=self.count)
+        return iter(settings) if self.separator is None else map(self.separator.join, settings)
+
+
+class Permutations(Keyspace):
+    # every ordering of count values from a list, in the order of itertools.permutations e.g. rotor orders
+    def __init__(self, values, count=3, separator=" "):
+        self.values = list(values)
+        self.count = count
+        self.separator = separator
+        self.size = perm(len(self.values), count)
+
+    def decode(self, index):
+        remaining = list(self.values)
+        setting = []
+        for x in range(0, self.count):
+            # orderings which share the values chosen so far, one block for each choice of the next value
+            block = perm(len(remaining) - 1, self.count - x - 1)
+            choice, index = divmod(index, block)
+            setting.append(remaining.pop(choice))
+        return tuple(setting) if self.separator is None else self.separator.join(setting)
+
+    def __iter__(self):
+        settings = permutations(self.values, self.count)
+        return iter(settings) if self.separator is None else map(self.separator.join, settings)
+
+
+class Combinations(Keyspace):
+    # every choice of count values from a list where order does not matter, in the order of itertools.combinations
+    def __init__(self, values, count, separator=None):
+        self.values = list(values)
+        self.count = count
+        self.separator = separator
+        self.size = comb(len(self.values), count)
+
+    def decode(self, index):
+        setting = []
+        first = 0
+        for x in range(0, self.count):
+            # skips the blocks of combinations whose next value comes before the one at this index
+            while True:
+                block = comb(len(self.values) - first - 1, self.count - x - 1)
+                if index < block:
+                    break
+                index -= block
+                first += 1
+            setting.append(self.values[first])
+            first += 1
+        return tuple(setting) if self.separator is None else self.separator.join(setting)
+
+    def __iter__(self):
+        settings = combinations(self.values, self.count)
+        return iter(settings) if self.separator is None else map(self.separator.join, settings)
+
+
+class Chain(Keyspace):
+    # the settings of several keyspaces (or lists) one after another
+    def __init__(self, *keyspaces):
+        self.keyspaces = []
+        for keyspace in keyspaces:
+            # chains of chains are flattened so finding the part an index is in stays quick
+            self.keyspaces.extend(keyspace.keyspaces if isinstance(keyspace, Chain) else [keyspace])
+        self.size = sum(len(keyspace) for keyspace in self.keyspaces)
+
+    def decode(self, index):
+        for keyspace in self.keyspaces:
+            if index < len(keyspace):
+                return keyspace[index]
+            index -= len(keyspace)
+        raise IndexError('keyspace index out of range')
+
+    def __iter__(self):
+        for keyspace in self.keyspaces:
+            yield from keyspace
@@ -0,0 +1,145 @@
+from array import array
+import math
+import mmap
+import struct
+import sys
+# Scores how much a piece of text looks like language using n-gram log probabilities.
+# Letters are handled as integers (0 = A ... 25 = Z) and an n-gram is indexed by its base 26 value,
+# e.g. the trigram "THE" is at 19 * 676 + 7 * 26 + 4.
+
+class NgramScorer:
+    # @param - order - length of the n-grams scored e.g. 2 for bigrams or 3 for trigrams
+    # @param - table - list of 26 ** order log10 probabilities
+    # @param - path - binary n-gram file the table is mapped from, if it is (see NgramStore)
+    def __init__(self, order, table, path=None):
+        if len(table) != 26 ** order:
+            raise ValueError('invalid n-gram table: it must have 26 ** order entries')
+        self.order = order
+        self.table = table
+        self.path = path
+
+    def __reduce__(self):
+        # a scorer of a mapped file is pickled as its path and order, so a worker process given it maps the
+        # file itself rather than being sent a copy of the table
+        if self.path is not None:
+            return load_scorer, (self.path, self.order)
+        return NgramScorer, (self.order, self.table)
+
+    def index(self, values, start):
+        # returns the table index of the n-gram beginning at start
+        index = 0
+        for value in values[start:start + self.order]:
+            index = index * 26 + value
+        return index
+
+    def score_at(self, values, start):
+        return self.table[self.index(values, start)]
+
+    def score(self, values):
+        # returns the total log probability of every n-gram in a list of integer letters
+        total = 0.0
+        for start in range(0, len(values) - self.order + 1):
+            total += self.table[self.index(values, start)]
+        return total
+
+    def score_text(self, text):
+        return self.score(text_values(text))
+
+
+# method which returns the integer letters of the A-Z characters in some text, ignoring everything else
+def text_values(text):
+    return [ord(character) - 65 for character in text.upper() if 'A' <= character <= 'Z']
+
+# method which counts the n-grams of a corpus of text and returns an NgramScorer of their log probabilities
+# n-grams which never appear in the corpus are given the probability of a hundredth of one appearance
+# @param - text - corpus e.g. the contents of a book, anything other than letters is ignored
+# @param - order - length of the n-grams e.g. 3 for trigrams
+def build_scorer(text, order=3):
+    values = text_values(text)
+    counts = [0] * (26 ** order)
+    scorer = NgramScorer(order, counts)
+    for start in range(0, len(values) - order + 1):
+        counts[scorer.index(values, start)] += 1
+    total = sum(counts)
+    if total == 0:
+        raise ValueError('invalid corpus: it must have at least one n-gram')
+    floor = math.log10(0.01 / total)
+    scorer.table = [math.log10(count / total) if count else floor for count in counts]
+    return scorer
+
+# Binary n-gram files hold unigram to quadgram tables so workers can share them without parsing text.
+# Layout: 16 byte header (b"ENIGNGRM", version, highest order) followed by each order's table of
+# 26 ** order little endian 32 bit floats, unigrams first.
+
+NGRAM_MAGIC = b"ENIGNGRM"
+NGRAM_VERSION = 1
+NGRAM_HEADER = struct.Struct("<8sII")
+
+# method which builds every order of n-gram table from a corpus and writes them to a binary file
+# @param - text - corpus e.g. the contents of a book, anything other than letters is ignored
+# @param - path - file to write
+# @param - max_order - highest order of n-gram stored, default 4 (quadgrams)
+def build_ngram_file(text, path, max_order=4):
+    if not 1 <= max_order <= 5:
+        raise ValueError('invalid n-gram order: must be between 1 and 5')
+    with open(path, "wb") as file:
+        file.write(NGRAM_HEADER.pack(NGRAM_MAGIC, NGRAM_VERSION, max_order))
+        for order in range(1, max_order + 1):
+            table = array("f", build_scorer(text, order).table)
+            if sys.byteorder != "little":
+                table.byteswap()
+            table.tofile(file)
+
+
+class NgramStore:
+    # the tables of a binary n-gram file, memory mapped so every process reading the same file shares
+    # one copy in the page cache and nothing is parsed when it is opened
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.map) < NGRAM_HEADER.size:
+            self.map.close()
+            raise ValueError('invalid n-gram file: too short')
+        magic, version, self.max_order = NGRAM_HEADER.unpack_from(self.map)
+        size = NGRAM_HEADER.size + 4 * sum(26 ** order for order in range(1, self.max_order + 1))
+        if magic != NGRAM_MAGIC or version != NGRAM_VERSION or len(self.map) != size:
+            self.map.close()
+            raise ValueError('invalid n-gram file: not a version %d n-gram file' % NGRAM_VERSION)
+        if sys.byteorder == "little":
+            self.values = memoryview(self.map).cast("f")
+        else:
+            # big endian machines have to copy the tables to swap their byte order
+            self.values = array("f")
+            self.values.frombytes(self.map[:])
+            self.values.byteswap()
+        self.tables = {}
+        start = NGRAM_HEADER.size // 4
+        for order in range(1, self.max_order + 1):
+            self.tables[order] = self.values[start:start + 26 ** order]
+            start += 26 ** order
+
+    def scorer(self, order=4):
+        # returns an NgramScorer reading straight from the mapped table of this order
+        if order not in self.tables:
+            raise ValueError('invalid n-gram order: the file only has orders 1 to %d' % self.max_order)
+        return NgramScorer(order, self.tables[order], self.path)
+
+    def close(self):
+        # the scorers of this store cannot be used once it is closed
+        for table in list(self.tables.values()) + [self.values]:
+            if isinstance(table, memoryview):
+                table.release()
+        self.tables = {}
+        self.map.close()
+
+
+# stores opened by load_scorer, so a process maps each file once however many scorers it is given
+open_stores = {}
+
+# method which returns an NgramScorer of one order of a binary n-gram file, mapping the file if this process
+# has not already
+def load_scorer(path, order=4):
+    if path not in open_stores:
+        open_stores[path] = NgramStore(path)
+    return open_stores[path].scorer(order)
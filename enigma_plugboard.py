@@ -0,0 +1,152 @@
+import random
+import time
+from enigma_code import *
+from enigma_ngrams import *
+# Ciphertext only plugboard recovery by hill climbing, for when the rotor settings are known.
+# Letters are handled as integers (0 = A ... 25 = Z) and a plugboard is a list where board[x] is the
+# letter x is connected to (itself if it has no lead).
+
+class PlugboardClimber:
+    # @param - rotors, reflector, ring_settings, initial_positions - known settings as for create_enigma_machine
+    # @param - code - ciphertext to find the plugboard of
+    # @param - scorer - NgramScorer used to score each candidate decryption
+    # @param - max_leads - number of leads available, 10 as in Plugboard
+    def __init__(self, rotors, reflector, ring_settings, initial_positions, code, scorer, max_leads=10):
+        if len(code) < scorer.order:
+            raise ValueError('invalid code: too short to score')
+        enigma = create_enigma_machine(rotors, reflector, ring_settings, initial_positions)
+        # the rotors and reflector do the same whatever the plugboard is, so they are only stepped once
+        self.scramblers = enigma.scrambler_sequence(len(code))
+        self.code = [ord(character) - 65 for character in code]
+        self.scorer = scorer
+        self.max_leads = max_leads
+        # positions of each letter in the code, whose decryptions change if that letter's lead changes
+        self.by_code_letter = [[] for x in range(26)]
+        for position, value in enumerate(self.code):
+            self.by_code_letter[value].append(position)
+        self.set_board(list(range(26)))
+
+    def set_board(self, board):
+        # decodes the whole code with a plugboard and scores it
+        self.board = list(board)
+        # middle[i] is the letter leaving the reflector path at position i, before the plugboard
+        self.middle = [table[self.board[value]] for table, value in zip(self.scramblers, self.code)]
+        self.plain = [self.board[value] for value in self.middle]
+        self.by_middle_letter = [set() for x in range(26)]
+        for position, value in enumerate(self.middle):
+            self.by_middle_letter[value].add(position)
+        self.score = self.scorer.score(self.plain)
+
+    def try_board(self, board, changed):
+        # returns how much the score would change with a new plugboard whose leads differ only at the
+        # changed letters, decoding again only the positions whose path goes through those letters
+        affected = set()
+        for letter in changed:
+            affected.update(self.by_code_letter[letter])
+            affected.update(self.by_middle_letter[letter])
+        order = self.scorer.order
+        starts = set()
+        for position in affected:
+            starts.update(range(max(0, position - order + 1), min(position, len(self.plain) - order) + 1))
+        old_score = 0.0
+        for start in starts:
+            old_score += self.scorer.score_at(self.plain, start)
+        # new decryptions are written in place, then put back so the state is unchanged
+        updates = {}
+        old_plain = {}
+        for position in affected:
+            middle = self.scramblers[position][board[self.code[position]]]
+            updates[position] = middle
+            old_plain[position] = self.plain[position]
+            self.plain[position] = board[middle]
+        new_score = 0.0
+        for start in starts:
+            new_score += self.scorer.score_at(self.plain, start)
+        for position, value in old_plain.items():
+            self.plain[position] = value
+        return new_score - old_score, updates
+
+    def accept(self, board, updates, change):
+        self.board = board
+        for position, middle in updates.items():
+            if self.middle[position] != middle:
+                self.by_middle_letter[self.middle[position]].discard(position)
+                self.by_middle_letter[middle].add(position)
+                self.middle[position] = middle
+            self.plain[position] = board[middle]
+        self.score += change
+
+    def moves(self, first, second):
+        # yields (plugboard, changed letters) for each way of changing the leads of two letters:
+        # adding a lead between them, removing it, or moving or swapping the ends of their existing leads
+        board = self.board
+        first_lead, second_lead = board[first], board[second]
+        leads = len([x for x in range(26) if board[x] > x])
+        if first_lead == second:
+            yield self.rewire(board, [(first, first), (second, second)])
+        elif first_lead == first and second_lead == second:
+            if leads < self.max_leads:
+                yield self.rewire(board, [(first, second)])
+        elif second_lead == second:
+            # first has a lead to another letter, which is moved to second or stays and takes second instead
+            yield self.rewire(board, [(first, second), (first_lead, first_lead)])
+            yield self.rewire(board, [(first_lead, second), (first, first)])
+        elif first_lead == first:
+            yield self.rewire(board, [(second, first), (second_lead, second_lead)])
+            yield self.rewire(board, [(second_lead, first), (second, second)])
+        else:
+            yield self.rewire(board, [(first, second), (first_lead, second_lead)])
+            yield self.rewire(board, [(first, second_lead), (second, first_lead)])
+
+    def rewire(self, board, leads):
+        new_board = list(board)
+        for first, second in leads:
+            new_board[first] = second
+            new_board[second] = first
+        changed = [x for x in range(26) if new_board[x] != board[x]]
+        return new_board, changed
+
+    def climb(self, generator, deadline=None):
+        # makes the first improving move found until no move improves the score or time runs out
+        pairs = [(first, second) for first in range(26) for second in range(first + 1, 26)]
+        improved = True
+        while improved:
+            improved = False
+            generator.shuffle(pairs)
+            for first, second in pairs:
+                if deadline is not None and time.monotonic() > deadline:
+                    return
+                for board, changed in self.moves(first, second):
+                    change, updates = self.try_board(board, changed)
+                    if change > 1e-9:
+                        self.accept(board, updates, change)
+                        improved = True
+                        break
+
+    def solve(self, restarts=5, time_limit=None, seed=None):
+        # climbs from an empty plugboard restarts times, each with the moves tried in a different order,
+        # and returns the best result as a dictionary of the plugboard pairs, score and plaintext
+        # @param - time_limit - seconds allowed for all of the restarts, default is no limit
+        generator = random.Random(seed)
+        deadline = None if time_limit is None else time.monotonic() + time_limit
+        best = None
+        for x in range(0, restarts):
+            self.set_board(list(range(26)))
+            self.climb(generator, deadline)
+            if best is None or self.score > best["score"]:
+                best = {"plugboard": self.pairs(), "score": self.score,
+                        "plaintext": "".join(chr(value + 65) for value in self.plain)}
+            if deadline is not None and time.monotonic() > deadline:
+                break
+        return best
+
+    def pairs(self):
+        return [chr(x + 65) + chr(self.board[x] + 65) for x in range(26) if self.board[x] > x]
+
+
+# method which finds the plugboard leads of a code when the rest of the settings are known
+# returns a dictionary of the plugboard pairs, score and plaintext
+def recover_plugboard(rotors, reflector, ring_settings, initial_positions, code, scorer, restarts=5,
+                      time_limit=None, seed=None, max_leads=10):
+    climber = PlugboardClimber(rotors, reflector, ring_settings, initial_positions, code, scorer, max_leads)
+    return climber.solve(restarts, time_limit, seed)
@@ -0,0 +1,1026 @@
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import hashlib
+import heapq
+from itertools import chain
+from itertools import islice
+from itertools import product
+import json
+import os
+import tempfile
+import enigmaadvanced_code
+from enigma_code import *
+from enigma_keyspace import *
+# General keyspace search. A SearchSpace describes which machine settings are unknown, and search
+# splits every combination of them into shards which are decoded on all cores by a process pool.
+
+class SearchSpace(Keyspace):
+    # every argument is either one known setting or a list or keyspace of possible settings
+    # lists and keyspaces are kept as they are, so a lazy keyspace is never turned into a list
+    # @param - rotors - rotors e.g. "I II III", or a list of them (see rotor_orders)
+    # @param - reflectors - reflector name, or a list of names and/or (name, rewired pairs) tuples (see reflector_rewires)
+    # @param - ring_settings - ring settings e.g. "01 01 01", or a list of them (see ring_setting_combinations)
+    # @param - initial_positions - starting positions e.g. "A A Z", or a list of them (see all_positions)
+    # @param - plugboards - list or keyspace of possible plugboard pair lists (see missing_lead_plugboards),
+    # default is only an empty plugboard
+    # @param - create_machine - function which builds the machine searched with, e.g. enigmaadvanced_code.create_enigma_machine
+    # to search the advanced rotors, default is enigma_code's create_enigma_machine
+    def __init__(self, rotors, reflectors, ring_settings, initial_positions, plugboards=[[]], create_machine=create_enigma_machine):
+        self.create_machine = create_machine
+        self.dimensions = [self.as_list(rotors), self.as_list(reflectors), self.as_list(ring_settings),
+                           self.as_list(initial_positions),
+                           plugboards if isinstance(plugboards, (list, Keyspace)) else list(plugboards)]
+        self.size = 1
+        for dimension in self.dimensions:
+            if len(dimension) == 0:
+                raise ValueError('invalid search space: every setting needs at least one possibility')
+            self.size *= len(dimension)
+
+    def as_list(self, settings):
+        if isinstance(settings, (str, tuple)):
+            return [settings]
+        if isinstance(settings, (list, Keyspace)):
+            return settings
+        return list(settings)
+
+    def digits(self, index):
+        # returns the index into each dimension of the candidate at this index
+        # the last dimension changes fastest, like nested for loops
+        digits = []
+        for dimension in reversed(self.dimensions):
+            index, digit = divmod(index, len(dimension))
+            digits.append(digit)
+        return digits[::-1]
+
+    def decode(self, index):
+        return self.candidate(index)
+
+    def candidate(self, index):
+        # returns the settings at this index as (rotors, reflector, ring settings, positions, plugboard, rewired pairs)
+        if not 0 <= index < self.size:
+            raise IndexError('search space index out of range')
+        settings = [dimension[digit] for dimension, digit in zip(self.dimensions, self.digits(index))]
+        rotors, reflector, ring_settings, initial_positions, plugboard = settings
+        rewired_pairs = []
+        if isinstance(reflector, tuple):
+            reflector, rewired_pairs = reflector
+        return rotors, reflector, ring_settings, initial_positions, plugboard, rewired_pairs
+
+    def fingerprint(self):
+        # returns a hash of the machine and every possible value of each setting, which identifies the space
+        # each dimension is read through once, which is far quicker than the candidates they combine into
+        digest = hashlib.sha256()
+        digest.update((self.create_machine.__module__ + "." + self.create_machine.__qualname__).encode("ascii"))
+        for dimension in self.dimensions:
+            digest.update(b"|%d|" % len(dimension))
+            for setting in dimension:
+                digest.update(json.dumps(setting).encode("ascii") + b"\n")
+        return digest.hexdigest()
+
+    def shards(self, shard_size):
+        # splits the space into (start, stop) index ranges of at most shard_size candidates, see Shards
+        return Shards(len(self), shard_size)
+
+
+class Shards:
+    # the (start, stop) index ranges of at most size candidates that a space of length candidates is split
+    # into, each worked out from its shard number when it is asked for so no list of them is ever made
+    def __init__(self, length, size):
+        if size < 1:
+            raise ValueError('invalid shard size: must be at least 1')
+        self.length = length
+        self.size = size
+
+    def __len__(self):
+        return (self.length + self.size - 1) // self.size
+
+    def __getitem__(self, number):
+        if not 0 <= number < len(self):
+            raise IndexError('shard number out of range')
+        start = number * self.size
+        return start, min(start + self.size, self.length)
+
+    def __iter__(self):
+        for start in range(0, self.length, self.size):
+            yield start, min(start + self.size, self.length)
+
+
+# method which returns the only offsets in the code where the crib can be, as a standard machine never
+# encodes a letter to itself so the crib cannot sit anywhere a crib letter lines up with the same code letter
+def crib_offsets(code, crib):
+    offsets = []
+    for offset in range(0, len(code) - len(crib) + 1):
+        if all(crib[x] != code[offset + x] for x in range(len(crib))):
+            offsets.append(offset)
+    return offsets
+
+
+class CribChecker:
+    # tests whether a machine decodes the crib at any of its possible offsets, checking each offset one
+    # character at a time and moving on at the first mismatch, so most wrong keys are rejected after a
+    # few characters rather than after decoding the whole code
+    def __init__(self, code, crib):
+        self.offsets = crib_offsets(code, crib)
+        self.code_values = [ord(character) - 65 for character in code]
+        self.crib_values = [ord(character) - 65 for character in crib]
+        # key presses needed to reach the end of the last possible crib position
+        self.length = self.offsets[-1] + len(crib) if self.offsets else 0
+
+    def matches(self, enigma):
+        # returns True if the machine decodes the crib somewhere in the code, the machine's rotors are stepped
+        if not self.offsets:
+            return False
+        # records the rotor offsets for each key press, stepping is much cheaper than encoding
+        states = []
+        for x in range(0, self.length):
+            enigma.advance_rotors()
+            states.append([rotor.offset for rotor in enigma.rotors])
+        # characters decoded for one offset are kept for the overlapping offsets after it
+        decoded = {}
+        for offset in self.offsets:
+            for x in range(0, len(self.crib_values)):
+                index = offset + x
+                if index not in decoded:
+                    decoded[index] = enigma.encode_value(self.code_values[index], states[index])
+                if decoded[index] != self.crib_values[x]:
+                    break
+            else:
+                return True
+        return False
+
+
+# method which returns True if a machine can never encode a letter to itself, which crib_offsets and
+# CribChecker rely on: a standard machine never can, but the advanced plugboard can connect a letter to two
+# others, and then a letter can encode to itself
+def never_self_encodes(enigma):
+    plugboard = enigma.plugboard.table
+    reflector = enigma.reflector.tables[0]
+    return all(plugboard[plugboard[x]] == x and reflector[x] != x for x in range(0, 26))
+
+# method which reconfigures a machine for a candidate, only changing the settings that differ from the
+# previous candidate it was configured for
+# @param - settings, previous - tuples returned by SearchSpace.candidate
+def configure_machine(enigma, settings, previous=None):
+    rotors, reflector, ring_settings, initial_positions, plugboard, rewired_pairs = settings
+    if previous is None:
+        previous = (None,) * 6
+    if reflector != previous[1] or rewired_pairs != previous[5]:
+        enigma.set_reflector(reflector)
+        if rewired_pairs:
+            enigma.rewire_reflector(list(rewired_pairs))
+    if rotors != previous[0]:
+        enigma.set_rotors(rotors)
+        # rotors swapped in keep their old ring settings
+        previous = previous[:2] + (None,) + previous[3:]
+    if ring_settings != previous[2]:
+        enigma.set_rings(ring_settings)
+    if plugboard != previous[4]:
+        enigma.set_plugboard(plugboard)
+    enigma.set_positions(initial_positions)
+
+# method which decodes the code with one candidate and returns a match dictionary if the crib is found
+# @param - settings - tuple returned by SearchSpace.candidate
+# @param - checker - optional CribChecker for the code and crib, only the candidates it accepts are fully decoded
+# (it is not used for a machine which can encode a letter to itself, see never_self_encodes)
+# @param - enigma - optional machine to reconfigure rather than making a new one
+# @param - previous - settings the machine was last configured for
+# @param - stats - optional SearchStats to count the candidate and time each stage in
+def evaluate_candidate(settings, code, crib, checker=None, enigma=None, previous=None, stats=None):
+    rotors, reflector, ring_settings, initial_positions, plugboard, rewired_pairs = settings
+    if enigma is None:
+        enigma = create_enigma_machine(rotors, reflector, ring_settings, initial_positions, plugboard, stats=stats)
+        if rewired_pairs:
+            enigma.rewire_reflector(list(rewired_pairs))
+    elif stats is None:
+        configure_machine(enigma, settings, previous)
+    else:
+        started = stats.timer()
+        configure_machine(enigma, settings, previous)
+        stats.add_time("configuration", stats.timer() - started)
+    if checker is not None and never_self_encodes(enigma):
+        if stats is None:
+            accepted = checker.matches(enigma)
+        else:
+            started = stats.timer()
+            accepted = checker.matches(enigma)
+            stats.add_time("crib check", stats.timer() - started)
+        if not accepted:
+            if stats is not None:
+                stats.count_candidate()
+            return None
+        # the checker has stepped the rotors so they are put back to their starting positions
+        enigma.set_positions(initial_positions)
+    plaintext = enigma.encode(code)
+    if crib_found(crib, plaintext, stats):
+        return {"rotors": rotors, "reflector": reflector, "ring_settings": ring_settings,
+                "initial_positions": initial_positions, "plugboard": list(plugboard),
+                "reflector_rewires": list(rewired_pairs), "plaintext": plaintext}
+    return None
+
+# method which searches one range of the space and returns a list of the matches found in it
+# one machine is reconfigured for every candidate in the range
+# @param - stats - optional SearchStats to record the shard in
+# @param - enigma - optional machine made by the space's create_machine to reconfigure, e.g. one kept from an
+# earlier shard of the same space
+def search_shard(space, code, crib, start, stop, stats=None, enigma=None):
+    matches = []
+    checker = CribChecker(code, crib)
+    previous = None
+    for index in range(start, stop):
+        settings = space.candidate(index)
+        if enigma is None:
+            enigma = space.create_machine(*settings[:5], stats=stats)
+        match = evaluate_candidate(settings, code, crib, checker, enigma, previous, stats)
+        previous = settings
+        if match is not None:
+            match["index"] = index
+            matches.append(match)
+    return matches
+
+# each worker process is given the search once when it starts rather than with every shard
+# (the third part is the crib, or the scorer of a scored search)
+worker_search = None
+# shards queued for each worker process at a time, so shards are only handed to the pool as they are
+# needed and a search closed early only waits for the shards already being searched
+SHARDS_PER_PROCESS = 2
+
+def start_worker(space, code, crib):
+    global worker_search
+    worker_search = (space, code, crib)
+
+def search_worker_shard(start, stop, instrumented=False):
+    # returns the shard's matches, with a SearchStats of the shard if instrumented
+    space, code, crib = worker_search
+    if not instrumented:
+        return search_shard(space, code, crib, start, stop)
+    stats = SearchStats()
+    return search_shard(space, code, crib, start, stop, stats), stats
+
+# method which runs function(start, stop, *args) for each shard on a pool whose workers are started with
+# start_worker(*search), and yields (start, stop, result) for each shard as soon as it has finished
+# if the caller stops early (closes the generator or is interrupted) the shards not yet started are cancelled
+def run_shards(function, shards, search, processes, *args):
+    shards = iter(shards)
+    executor = ProcessPoolExecutor(processes, initializer=start_worker, initargs=search)
+    futures = {}
+    try:
+        while True:
+            for start, stop in islice(shards, processes * SHARDS_PER_PROCESS - len(futures)):
+                futures[executor.submit(function, start, stop, *args)] = (start, stop)
+            if not futures:
+                break
+            finished, pending = wait(futures, return_when=FIRST_COMPLETED)
+            for future in finished:
+                start, stop = futures.pop(future)
+                yield start, stop, future.result()
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+# method which searches a list of shards and yields (start, stop, matches) for each shard as soon as it has finished
+# @param - shards - iterable of (start, stop) index ranges, see SearchSpace.shards
+# @param - processes - number of worker processes, default is one per core, 1 searches in this process
+# @param - stats - optional SearchStats which the stats of every shard are added to
+def search_shards(space, code, crib, shards, processes=None, stats=None):
+    if processes is None:
+        processes = os.cpu_count() or 1
+    shards = iter(shards)
+    # the first two shards are taken to see whether a pool is worth starting
+    first = list(islice(shards, 2))
+    if processes == 1 or len(first) <= 1:
+        for start, stop in chain(first, shards):
+            yield start, stop, search_shard(space, code, crib, start, stop, stats)
+        return
+    shards = chain(first, shards)
+    instrumented = stats is not None
+    for start, stop, matches in run_shards(search_worker_shard, shards, (space, code, crib), processes, instrumented):
+        if instrumented:
+            matches, shard_stats = matches
+            stats.merge(shard_stats)
+        yield start, stop, matches
+
+# method which searches the whole space and yields each match as soon as its shard has finished
+# matches are dictionaries of the settings, the plaintext and the candidate's index in the space
+# @param - processes - number of worker processes, default is one per core, 1 searches in this process
+# @param - shard_size - number of candidates each worker is given at a time
+# @param - stats - optional SearchStats to record the search in
+def search(space, code, crib, processes=None, shard_size=1000, stats=None):
+    for start, stop, matches in search_shards(space, code, crib, space.shards(shard_size), processes, stats):
+        yield from matches
+
+# method which returns every match of the search in the order of the space, like the code_* functions
+def search_all(space, code, crib, processes=None, shard_size=1000, stats=None):
+    return sorted(search(space, code, crib, processes, shard_size, stats), key=lambda match: match["index"])
+
+# Scored searches keep only the best candidates rather than every match, for when a crib is not known
+# exactly or decryptions are scored statistically (e.g. an NgramScorer from enigma_ngrams)
+
+class TopCandidates:
+    # the k highest scoring candidates of a search, kept in a heap of (score, index in the space) so each
+    # entry is two numbers whatever the settings are, and the plaintext is only decoded again for the survivors
+    # collectors from different shards or workers are combined with merge
+    def __init__(self, k=10):
+        if k < 1:
+            raise ValueError('invalid collector: k must be at least 1')
+        self.k = k
+        # lowest score first, so the worst survivor is the one replaced
+        self.heap = []
+
+    def __len__(self):
+        return len(self.heap)
+
+    def add(self, score, index):
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, (score, index))
+        elif (score, index) > self.heap[0]:
+            heapq.heapreplace(self.heap, (score, index))
+
+    def merge(self, other):
+        # adds the entries of another collector and returns this one
+        for score, index in other.heap:
+            self.add(score, index)
+        return self
+
+    def best(self):
+        # returns the (score, index) entries from best to worst
+        return sorted(self.heap, reverse=True)
+
+    def results(self, space, code):
+        # returns a match dictionary for each survivor from best to worst, decoding its plaintext again
+        results = []
+        for score, index in self.best():
+            rotors, reflector, ring_settings, initial_positions, plugboard, rewired_pairs = space.candidate(index)
+            enigma = space.create_machine(rotors, reflector, ring_settings, initial_positions, plugboard)
+            if rewired_pairs:
+                enigma.rewire_reflector(list(rewired_pairs))
+            results.append({"rotors": rotors, "reflector": reflector, "ring_settings": ring_settings,
+                            "initial_positions": initial_positions, "plugboard": list(plugboard),
+                            "reflector_rewires": list(rewired_pairs), "score": score, "index": index,
+                            "plaintext": enigma.encode(code)})
+        return results
+
+
+class CribScorer:
+    # scores a decryption by the most letters of the crib it matches at any one offset, for cribs which
+    # are only partly right
+    def __init__(self, crib):
+        self.crib = crib
+
+    def score_text(self, text):
+        best = 0
+        for offset in range(0, len(text) - len(self.crib) + 1):
+            best = max(best, sum(1 for x in range(len(self.crib)) if text[offset + x] == self.crib[x]))
+        return best
+
+# method which decodes and scores every candidate of one range of the space and returns a TopCandidates of the best k
+# @param - scorer - object with a score_text(plaintext) method, higher scores are better
+def scored_shard(space, code, scorer, start, stop, k=10):
+    top = TopCandidates(k)
+    enigma = None
+    previous = None
+    for index in range(start, stop):
+        settings = space.candidate(index)
+        if enigma is None:
+            enigma = space.create_machine(*settings[:5])
+        configure_machine(enigma, settings, previous)
+        previous = settings
+        top.add(scorer.score_text(enigma.encode(code)), index)
+    return top
+
+def scored_worker_shard(start, stop, k):
+    space, code, scorer = worker_search
+    return scored_shard(space, code, scorer, start, stop, k)
+
+# method which scores every candidate of the space and returns match dictionaries of the best k, best first
+# each dictionary also has the candidate's score
+# @param - scorer - object with a score_text(plaintext) method, it is sent to each worker so must be picklable
+def scored_search(space, code, scorer, k=10, processes=None, shard_size=1000):
+    shards = space.shards(shard_size)
+    if processes is None:
+        processes = os.cpu_count() or 1
+    top = TopCandidates(k)
+    if processes == 1 or len(shards) <= 1:
+        for start, stop in shards:
+            top.merge(scored_shard(space, code, scorer, start, stop, k))
+    else:
+        for start, stop, shard_top in run_shards(scored_worker_shard, shards, (space, code, scorer), processes, k):
+            top.merge(shard_top)
+    return top.results(space, code)
+
+# Checkpoints let a long search carry on after a crash. A checkpoint file is a line of JSON describing
+# the search followed by one line per finished shard with its number and matches. Lines are only ever
+# appended, once per shard, while the workers carry on with the next shards.
+
+# method which reads a checkpoint file and returns its description and a dictionary of shard number to
+# matches for every finished shard, a line cut short by a crash is ignored
+def read_checkpoint(path):
+    description = None
+    finished = {}
+    with open(path) as file:
+        for number, line in enumerate(file, 1):
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if description is None:
+                if not isinstance(entry, dict) or "shard" in entry:
+                    raise ValueError('invalid checkpoint: the first line must describe the search')
+                description = entry
+            elif isinstance(entry, dict) and isinstance(entry.get("shard"), int) and isinstance(entry.get("matches"), list):
+                finished[entry["shard"]] = entry["matches"]
+            else:
+                raise ValueError('invalid checkpoint: line %d is not a finished shard' % number)
+    return description, finished
+
+# method which searches the whole space like search, writing each finished shard to a checkpoint file
+# if the file already exists the shards it records are not searched again, their matches are yielded first
+# @param - path - checkpoint file, the same path must be given with the same search to resume it
+def checkpointed_search(space, code, crib, path, processes=None, shard_size=1000):
+    description = {"size": len(space), "shard_size": shard_size, "code": code, "crib": crib, "space": space.fingerprint()}
+    finished = {}
+    # the description is only written to a new file, or one whose description was cut short by a crash
+    resuming = os.path.exists(path) and os.path.getsize(path) > 0
+    if resuming:
+        saved, finished = read_checkpoint(path)
+        if saved is None:
+            resuming = False
+            open(path, "w").close()
+        elif saved != description:
+            raise ValueError('invalid checkpoint: it was written by a different search')
+    for number in sorted(finished):
+        yield from finished[number]
+    shards = (shard for number, shard in enumerate(space.shards(shard_size)) if number not in finished)
+    with open(path, "a+") as file:
+        file.seek(0, os.SEEK_END)
+        if file.tell() > 0:
+            file.seek(file.tell() - 1)
+            if file.read(1) != "\n":
+                # a line cut short by a crash is ended so the next shard starts on its own line
+                file.write("\n")
+        if not resuming:
+            file.write(json.dumps(description) + "\n")
+            file.flush()
+        for start, stop, matches in search_shards(space, code, crib, shards, processes):
+            file.write(json.dumps({"shard": start // shard_size, "matches": matches}) + "\n")
+            # flushed so a crash loses at most the shards still being searched
+            file.flush()
+            yield from matches
+
+# method which checks a search resumes from a checkpoint that only has its description, as left by a crash
+# before the first shard finished, twice over, and returns True if every resume gives the same matches
+def check_checkpoint_resume(code_search=None, processes=1, shard_size=1000):
+    space, code, crib = (code_search or code_two_search)()
+    expected = sorted(match["index"] for match in search_all(space, code, crib, processes, shard_size))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "checkpoint.jsonl")
+        list(checkpointed_search(space, code, crib, path, processes, shard_size))
+        with open(path) as file:
+            header = file.readline()
+        for attempt in range(0, 2):
+            with open(path, "w") as file:
+                file.write(header)
+            first = sorted(match["index"] for match in checkpointed_search(space, code, crib, path, processes, shard_size))
+            again = sorted(match["index"] for match in checkpointed_search(space, code, crib, path, processes, shard_size))
+            with open(path) as file:
+                headers = sum(1 for line in file if "shard" not in json.loads(line))
+            if first != expected or again != expected or headers != 1:
+                return False
+    return True
+
+# method which runs one of the code searches below with a checkpoint file and returns the possible messages
+# running it again with the same path after a crash skips the shards already finished
+# @param - code_search - e.g. code_three_search
+def checkpointed_code(code_search, path, processes=None, shard_size=1000):
+    space, code, crib = code_search()
+    matches = sorted(checkpointed_search(space, code, crib, path, processes, shard_size), key=lambda match: match["index"])
+    return [match["plaintext"] for match in matches]
+
+# Functions to describe unknown settings, each returns a lazy keyspace (see enigma_keyspace) rather
+# than a list, so the settings are only made as they are searched
+
+# method which returns every ordering of count rotors from a pool e.g. ["Beta", "Gamma", "II", "IV"]
+def rotor_orders(pool, count=3):
+    return Permutations(pool, count)
+
+# method which returns every combination of count ring settings from a list of allowed values e.g. ["02", "04"]
+def ring_setting_combinations(values, count=3):
+    return Product(values, count)
+
+# method which returns every combination of count starting positions e.g. "A A A" ... "Z Z Z"
+def all_positions(count=3):
+    return Product('ABCDEFGHIJKLMNOPQRSTUVWXYZ', count)
+
+
+class LeadPlugboards(Keyspace):
+    # every plugboard made from the known pairs and leads from each of the half known letters to distinct
+    # unused letters, e.g. known ["WP"], half known "AI", free "DEK" gives ["WP", "AD", "IE"] ...
+    def __init__(self, known_pairs, half_known, free_letters):
+        self.known_pairs = list(known_pairs)
+        self.half_known = half_known
+        self.letters = Permutations(free_letters, len(half_known), None)
+        self.size = len(self.letters)
+
+    def decode(self, index):
+        letters = self.letters.decode(index)
+        return self.known_pairs + [first + second for first, second in zip(self.half_known, letters)]
+
+# method which returns every plugboard made from the known pairs and leads from each of the half known letters
+# to distinct unused letters, see LeadPlugboards
+def missing_lead_plugboards(known_pairs, half_known, free_letters):
+    return LeadPlugboards(known_pairs, half_known, free_letters)
+
+
+class ReflectorRewires(Keyspace):
+    # every way of swapping the ends of two pairs of wires in a standard reflector, as (reflector, rewired
+    # pairs) tuples which can be used in the reflectors of a SearchSpace
+    def __init__(self, name):
+        self.name = name
+        mapping = reflector_from_name(name).get_mappings()
+        # each wire once, e.g. AY but not YA
+        self.wires = Combinations([pair for pair in mapping if pair[0] < pair[1]], 4)
+        # the three ways of splitting four wires into two pairs of wires
+        self.size = len(self.wires) * 3
+
+    def decode(self, index):
+        first, second, third, fourth = self.wires.decode(index // 3)
+        (a, b), (c, d) = [((first, second), (third, fourth)), ((first, fourth), (second, third)),
+                          ((first, third), (second, fourth))][index % 3]
+        return self.name, (a[0] + b[1], b[0] + a[1], c[0] + d[1], d[0] + c[1])
+
+# method which returns every way of swapping the ends of two pairs of wires in a standard reflector,
+# see ReflectorRewires
+def reflector_rewires(name):
+    return ReflectorRewires(name)
+
+# method which builds a SearchSpace from a JSON style description, so a search can be sent to a service or
+# to workers on other machines. Each setting is a string, a list, or a keyspace description:
+# {"permutations": ["I", "II", ...], "count": 3}, {"product": ["01", "02", ...], "count": 3},
+# {"reflector_rewires": ["A", "B"]} or {"lead_plugboards": [known pairs, half known letters, free letters]}
+# "machine": "advanced" searches with the rotors and reflectors of enigmaadvanced_code
+# "ring_classes": length of the code searches one representative of each ring setting and position class
+# (see RingClassSpace), each match standing for its whole class
+def space_from_spec(spec):
+    def setting(value):
+        if isinstance(value, dict):
+            if "permutations" in value:
+                return Permutations(value["permutations"], value.get("count", 3))
+            if "product" in value:
+                return Product(value["product"], value.get("count", 3))
+            if "reflector_rewires" in value:
+                return Chain(*[ReflectorRewires(name) for name in value["reflector_rewires"]])
+            if "lead_plugboards" in value:
+                return LeadPlugboards(*value["lead_plugboards"])
+            raise ValueError('invalid search description: unknown keyspace')
+        return value
+    if spec.get("machine", "standard") == "advanced":
+        create_machine = enigmaadvanced_code.create_enigma_machine
+    elif spec.get("machine", "standard") == "standard":
+        create_machine = create_enigma_machine
+    else:
+        raise ValueError('invalid search description: machine must be standard or advanced')
+    settings = [setting(spec[name]) for name in ("rotors", "reflectors", "ring_settings", "initial_positions")]
+    plugboards = setting(spec.get("plugboards", [[]]))
+    if "ring_classes" in spec:
+        return RingClassSpace(*settings, spec["ring_classes"], plugboards, create_machine)
+    return SearchSpace(*settings, plugboards, create_machine)
+
+# The code breaking searches of enigma_code expressed as search spaces
+# each method returns (space, code, crib)
+
+def code_one_search():
+    space = SearchSpace("Beta Gamma V", ["A", "B", "C"], "04 02 14", "M J M", [["KI", "XN", "FL"]])
+    return space, "DMEXBMKYCVPNQBEDHXVPZGKMTFFBJRPJTLHLCHOTKOYXGGHZ", "SECRETS"
+
+def code_two_search():
+    space = SearchSpace("Beta I III", "B", "23 02 10", all_positions(), [["VH", "PT", "ZG", "BJ", "EY", "FS"]])
+    return space, "CMFSUPKNCBMUYEQVVDYKLRQZTPUFHSWWAKTUGXMPAMYAFITXIJKMH", "UNIVERSITY"
+
+def code_three_search():
+    rotors = rotor_orders(["Beta", "Gamma", "II", "IV"])
+    ring_settings = ring_setting_combinations(["02", "04", "06", "08", "20", "22", "24", "26"])
+    space = SearchSpace(rotors, ["A", "B", "C"], ring_settings, "E M Y", [["FH", "TS", "BE", "UQ", "KD", "AL"]])
+    return space, "ABSKJAKKMRITTNYURBJFWQGRSGNNYJSDRYLAPQWIAGKJYEPCTAGDCTHLCDRZRFZHKNRSDLNPFPEBVESHPY", "THOUSANDS"
+
+def code_four_search():
+    plugboards = missing_lead_plugboards(["WP", "RJ", "VF", "HN", "CG", "BS"], "AI", "DEKLMOTUXYZ")
+    space = SearchSpace("V III IV", "A", "24 12 10", "S W U", plugboards)
+    return space, "SDNTVTPHRBNWTLMZTQKZGADDQYPFNHBPNHCQGBGMZPZLUAVGDQVYRBFYYEIXQWVTHXGNW", "TUTOR"
+
+def code_five_search():
+    reflectors = reflector_rewires("A") + reflector_rewires("B") + reflector_rewires("C")
+    space = SearchSpace("V II IV", reflectors, "06 18 07", "A J L", [["UG", "IE", "PO", "NX", "WT"]])
+    return space, "HWREISXLGTTBYVXRCWWJAKZDTVZWKBDJPVQYNEQIOTIFX", "INSTAGRAM"
+
+# method which returns one of the code searches above from its name e.g. "code_three_search", for names
+# sent by a client or over the network, raising a ValueError for any other name
+def code_search_from_name(name):
+    function = globals().get(name) if isinstance(name, str) and name.endswith("_search") else None
+    if not callable(function):
+        raise ValueError('invalid search: unknown code search')
+    return function
+
+# method which runs one of the searches above on all cores and returns the possible messages
+# @param - code_search - e.g. code_three_search
+def parallel_code(code_search, processes=None):
+    space, code, crib = code_search()
+    return [match["plaintext"] for match in search_all(space, code, crib, processes)]
+
+# Searches where only one part of the machine is unknown, which reuse everything else between candidates
+
+class RewiredReflectorSearch:
+    # tries rewired versions of a reflector while the rotors, rings, positions and plugboard are fixed
+    # the rotor path either side of the reflector is worked out once for each character, then each
+    # rewired reflector is a change to a few entries of an integer permutation, so only the characters
+    # whose path reaches one of the swapped contacts are decoded again
+    def __init__(self, rotors, ring_settings, initial_positions, plugboard_pairs, code, crib):
+        self.code = code
+        self.crib = crib
+        self.settings = (rotors, ring_settings, initial_positions, list(plugboard_pairs))
+        # the reflector is not used to record the rotor paths
+        enigma = create_enigma_machine(rotors, "A", ring_settings, initial_positions, plugboard_pairs)
+        plugboard = enigma.plugboard.table
+        # contact[i] is where character i reaches the reflector
+        # back[i][x] is the decoded letter when the reflector sends character i out of contact x
+        self.contact = []
+        self.back = []
+        for character in code:
+            enigma.advance_rotors()
+            value = plugboard[ord(character) - 65]
+            for n in range(len(enigma.rotors) - 1, -1, -1):
+                rotor = enigma.rotors[n]
+                value = (rotor.tables[0][(value + rotor.offset) % 26] - rotor.offset) % 26
+            self.contact.append(value)
+            table = list(range(26))
+            for rotor in enigma.rotors:
+                table = [(rotor.tables[1][(value + rotor.offset) % 26] - rotor.offset) % 26 for value in table]
+            self.back.append([plugboard[value] for value in table])
+        # positions of the characters reaching each contact
+        self.by_contact = [[] for x in range(26)]
+        for position, value in enumerate(self.contact):
+            self.by_contact[value].append(position)
+        self.crib_values = [ord(character) - 65 for character in crib]
+
+    def search(self, reflector, rewires=None):
+        # yields a match dictionary for each rewiring of the reflector whose decryption contains the crib
+        # @param - rewires - list of rewired pairs to try e.g. [("AJ", "HY", ...)], default every way of
+        # swapping two pairs of wires (see reflector_rewires)
+        if rewires is None:
+            rewires = [pairs for name, pairs in reflector_rewires(reflector)]
+        base = list(reflector_from_name(reflector).tables[0])
+        plain = [back[base[contact]] for contact, back in zip(self.contact, self.back)]
+        length = len(self.crib_values)
+        offsets = range(0, len(plain) - length + 1)
+        # mismatches[o] is the number of crib letters which do not match with the crib at offset o
+        mismatches = [sum(plain[o + x] != self.crib_values[x] for x in range(length)) for o in offsets]
+        for rewired_pairs in rewires:
+            # only the entries of the permutation that the rewiring changes
+            changes = {}
+            for pair in rewired_pairs:
+                changes[ord(pair[0]) - 65] = ord(pair[1]) - 65
+                changes[ord(pair[1]) - 65] = ord(pair[0]) - 65
+            changed = {}
+            for contact, value in changes.items():
+                for position in self.by_contact[contact]:
+                    changed[position] = self.back[position][value]
+            # recounts mismatches only for the crib offsets that overlap a changed character
+            affected = set()
+            for position in changed:
+                affected.update(range(max(0, position - length + 1), min(position, len(plain) - length) + 1))
+            found = any(mismatches[o] == 0 for o in offsets if o not in affected)
+            for o in affected:
+                if found:
+                    break
+                count = mismatches[o]
+                for position, value in changed.items():
+                    if o <= position < o + length:
+                        count += (value != self.crib_values[position - o]) - (plain[position] != self.crib_values[position - o])
+                found = count == 0
+            if found:
+                rotors, ring_settings, initial_positions, plugboard = self.settings
+                plaintext = "".join(chr(changed.get(position, value) + 65) for position, value in enumerate(plain))
+                yield {"rotors": rotors, "reflector": reflector, "ring_settings": ring_settings,
+                       "initial_positions": initial_positions, "plugboard": plugboard,
+                       "reflector_rewires": list(rewired_pairs), "plaintext": plaintext}
+
+# method which finds the rewired reflector of code five by delta evaluation and returns the possible messages
+def code_five_rewired():
+    search = RewiredReflectorSearch("V II IV", "06 18 07", "A J L", ["UG", "IE", "PO", "NX", "WT"],
+                                    "HWREISXLGTTBYVXRCWWJAKZDTVZWKBDJPVQYNEQIOTIFX", "INSTAGRAM")
+    possible_messages = []
+    for reflector in ["A", "B", "C"]:
+        for match in search.search(reflector):
+            possible_messages.append(match["plaintext"])
+    return possible_messages
+
+
+class PlugboardSearch:
+    # tries plugboards while the rotors, reflector, rings and positions are fixed
+    # the substitution made by the rotors and reflector at each character is worked out once, then each
+    # plugboard P decodes character i as P[scrambler[i][P[code[i]]]], with no rotor stepping at all
+    def __init__(self, rotors, reflector, ring_settings, initial_positions, code, crib):
+        self.code = code
+        self.crib = crib
+        self.settings = (rotors, reflector, ring_settings, initial_positions)
+        enigma = create_enigma_machine(rotors, reflector, ring_settings, initial_positions)
+        self.scramblers = enigma.scrambler_sequence(len(code))
+        self.code_values = [ord(character) - 65 for character in code]
+        self.crib_values = [ord(character) - 65 for character in crib]
+        self.offsets = crib_offsets(code, crib)
+
+    def decode(self, board):
+        # returns the decoded code as integers for a plugboard table
+        return [board[table[board[value]]] for table, value in zip(self.scramblers, self.code_values)]
+
+    def matches(self, board):
+        # returns True if the plugboard table decodes the crib at any of its possible offsets,
+        # moving on from an offset at its first mismatching letter
+        for offset in self.offsets:
+            for x in range(0, len(self.crib_values)):
+                value = self.code_values[offset + x]
+                if board[self.scramblers[offset + x][board[value]]] != self.crib_values[x]:
+                    break
+            else:
+                return True
+        return False
+
+    def search(self, plugboards):
+        # yields a match dictionary for each plugboard pair list whose decryption contains the crib
+        plugboard = Plugboard()
+        for plugboard_pairs in plugboards:
+            plugboard.clear()
+            for pair in plugboard_pairs:
+                plugboard.add(PlugLead(pair))
+            if self.matches(plugboard.table):
+                rotors, reflector, ring_settings, initial_positions = self.settings
+                plaintext = "".join(chr(value + 65) for value in self.decode(plugboard.table))
+                yield {"rotors": rotors, "reflector": reflector, "ring_settings": ring_settings,
+                       "initial_positions": initial_positions, "plugboard": list(plugboard_pairs),
+                       "reflector_rewires": [], "plaintext": plaintext}
+
+# method which finds the missing leads of code four from cached scramblers and returns the possible messages
+def code_four_plugboard():
+    search = PlugboardSearch("V III IV", "A", "24 12 10", "S W U",
+                             "SDNTVTPHRBNWTLMZTQKZGADDQYPFNHBPNHCQGBGMZPZLUAVGDQVYRBFYYEIXQWVTHXGNW", "TUTOR")
+    plugboards = missing_lead_plugboards(["WP", "RJ", "VF", "HN", "CG", "BS"], "AI", "DEKLMOTUXYZ")
+    return [match["plaintext"] for match in search.search(plugboards)]
+
+
+class RingPositionClasses(Keyspace):
+    # groups (ring settings, starting positions) combinations which decode a message of a given length
+    # identically, and is a keyspace of one (ring settings, starting positions) representative of each group
+    # a rotor's wiring only depends on its offset (position minus ring setting) and only the two rightmost
+    # rotors' positions decide when rotors step, so two combinations are equivalent when every rotor has
+    # the same offset and the two rightmost rotors step the same way over the message
+    # the classes are made rotor by rotor, so the cost is the number of classes rather than of combinations
+    # @param - enigma - machine with the rotors, whose own stepping is followed (its positions are changed)
+    # @param - ring_settings, initial_positions - every combination of some values for each rotor, e.g.
+    # from ring_setting_combinations and all_positions, or one setting e.g. "01 01 01"
+    # @param - length - number of characters in the message
+    def __init__(self, enigma, ring_settings, initial_positions, length):
+        if len(enigma.rotors) < 3:
+            raise ValueError('invalid rotors: at least three rotors are needed')
+        self.enigma = enigma
+        self.length = length
+        # for each rotor, its possible ring settings and positions as {value (0 - 25): setting}
+        self.rings = [{(int(ring) - 1) % 26: ring for ring in values}
+                      for values in self.rotor_values(ring_settings, len(enigma.rotors))]
+        self.positions = [{ord(position) - 65: position for position in values}
+                          for values in self.rotor_values(initial_positions, len(enigma.rotors))]
+        # the two rightmost rotors' positions grouped by how every rotor steps from them over the message
+        groups = {}
+        for pair in product(*[sorted(values) for values in self.positions[-2:]]):
+            groups.setdefault(self.pattern(pair), []).append(pair)
+        self.groups = list(groups.values())
+        # (ring value, position value) of one way to make each offset of each rotor on the left
+        self.left = [list(self.offsets(slot).values()) for slot in range(0, len(self.rings) - 2)]
+        # ((ring value, position value), (ring value, position value)) of one way to make each offset pair of
+        # the two rightmost rotors in each stepping group
+        self.right = []
+        for group in self.groups:
+            pairs = {}
+            for first, second in group:
+                for ring_first in self.rings[-2]:
+                    for ring_second in self.rings[-1]:
+                        pairs.setdefault(((first - ring_first) % 26, (second - ring_second) % 26),
+                                         ((ring_first, first), (ring_second, second)))
+            self.right.extend(pairs.values())
+        self.size = len(self.right)
+        for choices in self.left:
+            self.size *= len(choices)
+
+    def rotor_values(self, settings, count):
+        # returns the values each rotor can be set to, checking settings is every combination of them
+        if isinstance(settings, str):
+            settings = [settings]
+        if isinstance(settings, Product) and settings.separator == " ":
+            values = [list(settings.values)] * settings.count
+        else:
+            settings = [tuple(setting.split()) for setting in settings]
+            values = [list(dict.fromkeys(slot)) for slot in zip(*settings)]
+            size = 1
+            for slot in values:
+                size *= len(slot)
+            if len(set(settings)) != len(settings) or len(settings) != size:
+                raise ValueError('invalid settings: must be every combination of some values for each rotor')
+        if len(values) != count:
+            raise ValueError('partial ring or position values provided for rotors')
+        return values
+
+    def pattern(self, pair):
+        # returns how far each rotor has moved at each key press from these two rightmost positions
+        # (the other rotors only move when the middle rotor steps them, so where they start does not matter)
+        for rotor in self.enigma.rotors:
+            rotor.set_position("A")
+        for rotor, value in zip(self.enigma.rotors[-2:], pair):
+            rotor.set_position(chr(value + 65))
+        start = [ord(rotor.position) for rotor in self.enigma.rotors]
+        steps = []
+        for x in range(0, self.length):
+            self.enigma.advance_rotors()
+            steps.append(tuple((ord(rotor.position) - before) % 26 for rotor, before in zip(self.enigma.rotors, start)))
+        return tuple(steps)
+
+    def offsets(self, slot):
+        # returns {offset: (ring value, position value)} of the first way each offset of a rotor can be made
+        offsets = {}
+        for position in self.positions[slot]:
+            for ring in self.rings[slot]:
+                offsets.setdefault((position - ring) % 26, (ring, position))
+        return offsets
+
+    def decode(self, index):
+        # returns (ring settings, starting positions) of the representative of the class at this index
+        # the rightmost rotors' choice changes fastest
+        index, right = divmod(index, len(self.right))
+        choice = []
+        for choices in reversed(self.left):
+            index, digit = divmod(index, len(choices))
+            choice.append(choices[digit])
+        return self.settings(tuple(choice[::-1]) + self.right[right])
+
+    def settings(self, choice):
+        # returns the (ring settings, starting positions) strings of a (ring value, position value) for each rotor
+        return (" ".join(self.rings[slot][ring] for slot, (ring, position) in enumerate(choice)),
+                " ".join(self.positions[slot][position] for slot, (ring, position) in enumerate(choice)))
+
+    def expand(self, ring_settings, initial_positions):
+        # returns every combination in the same class as this one, in order of ring settings then positions
+        rings = [(int(ring) - 1) % 26 for ring in ring_settings.split()]
+        positions = [ord(position) - 65 for position in initial_positions.split()]
+        offsets = [(position - ring) % 26 for ring, position in zip(rings, positions)]
+        # a rotor on the left keeps its offset with any position whose ring setting is allowed
+        choices = []
+        for slot in range(0, len(rings) - 2):
+            choices.append([((position - offsets[slot]) % 26, position) for position in self.positions[slot]
+                            if (position - offsets[slot]) % 26 in self.rings[slot]])
+        # the two rightmost rotors also keep their stepping, so only the positions of their group are used
+        group = next(group for group in self.groups if tuple(positions[-2:]) in group)
+        right = []
+        for first, second in group:
+            ring_first, ring_second = (first - offsets[-2]) % 26, (second - offsets[-1]) % 26
+            if ring_first in self.rings[-2] and ring_second in self.rings[-1]:
+                right.append(((ring_first, first), (ring_second, second)))
+        return sorted(self.settings(choice[:-1] + choice[-1]) for choice in product(*choices, right))
+
+
+class RingClassSpace(SearchSpace):
+    # a SearchSpace which only has one (ring settings, starting positions) representative of each
+    # RingPositionClasses class, so it can be searched, sharded, checkpointed or sent to a service or cluster
+    # like any other space, and each match stands for every combination of its class (see expand)
+    # rotor orders which step the same way share their classes, as the classes only depend on stepping
+    # @param - length - number of characters in the code searched
+    # other parameters are the same as SearchSpace, with ring settings and positions as for RingPositionClasses
+    def __init__(self, rotors, reflectors, ring_settings, initial_positions, length, plugboards=[[]],
+                 create_machine=create_enigma_machine):
+        super().__init__(rotors, reflectors, ring_settings, initial_positions, plugboards, create_machine)
+        self.length = length
+        reflector = self.dimensions[1][0]
+        reflector = reflector[0] if isinstance(reflector, tuple) else reflector
+        shared = {}
+        # the classes of each rotor order and the index in the space its candidates start at
+        self.classes = []
+        self.starts = []
+        self.size = 0
+        for rotors in self.dimensions[0]:
+            enigma = create_machine(rotors, reflector, self.dimensions[2][0], self.dimensions[3][0])
+            stepping = tuple((type(rotor), getattr(rotor, "notch", None)) for rotor in enigma.rotors)
+            if stepping not in shared:
+                shared[stepping] = RingPositionClasses(enigma, self.dimensions[2], self.dimensions[3], length)
+            self.classes.append(shared[stepping])
+            self.starts.append(self.size)
+            self.size += len(self.dimensions[1]) * len(shared[stepping]) * len(self.dimensions[4])
+
+    def candidate(self, index):
+        # returns the settings at this index as (rotors, reflector, ring settings, positions, plugboard, rewired pairs)
+        if not 0 <= index < self.size:
+            raise IndexError('search space index out of range')
+        order = bisect_right(self.starts, index) - 1
+        classes = self.classes[order]
+        index, plugboard = divmod(index - self.starts[order], len(self.dimensions[4]))
+        reflector, representative = divmod(index, len(classes))
+        ring_settings, initial_positions = classes[representative]
+        reflector = self.dimensions[1][reflector]
+        rewired_pairs = []
+        if isinstance(reflector, tuple):
+            reflector, rewired_pairs = reflector
+        return (self.dimensions[0][order], reflector, ring_settings, initial_positions,
+                self.dimensions[4][plugboard], rewired_pairs)
+
+    def fingerprint(self):
+        return hashlib.sha256(("%s|classes|%d" % (super().fingerprint(), self.length)).encode("ascii")).hexdigest()
+
+    def expand(self, match):
+        # returns a copy of a match for every (ring settings, starting positions) combination of its class
+        order = bisect_right(self.starts, match["index"]) - 1
+        return [dict(match, ring_settings=ring_settings, initial_positions=initial_positions)
+                for ring_settings, initial_positions in self.classes[order].expand(match["ring_settings"], match["initial_positions"])]
+
+# method which searches every ring setting and starting position combination by trying one representative
+# of each equivalence class on all cores, then expands each hit back into all of its combinations
+# returns a list of match dictionaries in order of rotors, reflector, ring settings then positions
+# @param - create_machine - e.g. enigmaadvanced_code.create_enigma_machine for the advanced rotors
+def search_ring_classes(rotors, reflector, ring_settings, initial_positions, plugboard_pairs, code, crib,
+                        create_machine=create_enigma_machine, processes=None):
+    space = RingClassSpace(rotors, reflector, ring_settings, initial_positions, len(code), [plugboard_pairs], create_machine)
+    matches = []
+    for match in search_all(space, code, crib, processes):
+        matches.extend(space.expand(match))
+    return sorted(matches, key=lambda match: (match["index"], match["ring_settings"], match["initial_positions"]))
+
+# method which checks search_ring_classes finds exactly the matches of trying every combination with search_all
+# returns True if they agree
+def check_ring_classes(rotors, reflector, ring_settings, initial_positions, plugboard_pairs, code, crib,
+                       create_machine=create_enigma_machine, processes=None):
+    space = SearchSpace(rotors, reflector, ring_settings, initial_positions, [plugboard_pairs], create_machine)
+    found = [(match["rotors"], match["reflector"], match["ring_settings"], match["initial_positions"], match["plaintext"])
+             for match in search_ring_classes(rotors, reflector, ring_settings, initial_positions, plugboard_pairs,
+                                              code, crib, create_machine, processes)]
+    expected = [(match["rotors"], match["reflector"], match["ring_settings"], match["initial_positions"], match["plaintext"])
+                for match in search_all(space, code, crib, processes)]
+    return sorted(found) == sorted(expected)
+
+
+# most substitution tables a PositionIndex keeps while it is built
+POSITION_INDEX_CACHE = 4096
+
+
+class PositionIndex:
+    # for a day key where only the starting position is unknown, the encryption of a crib at a known offset
+    # of a message from every starting position, so a code can be matched to its starting positions by a
+    # dictionary lookup of its letters at that offset instead of decoding it from every position
+    # @param - crib - known plaintext, e.g. the usual opening words of a message
+    # @param - offset - where the crib is in the message, default is the start
+    def __init__(self, rotors, reflector, ring_settings, plugboard_pairs, crib, offset=0, entries=None):
+        self.settings = (rotors, reflector, ring_settings, list(plugboard_pairs))
+        self.crib = crib
+        self.offset = offset
+        self.positions = all_positions(len(rotors.split()))
+        # encrypted crib -> list of position numbers (indices into all_positions)
+        self.entries = entries
+        if entries is None:
+            self.build()
+
+    def build(self):
+        rotors, reflector, ring_settings, plugboard_pairs = self.settings
+        # neighbouring positions pass through the same rotor states, so their substitutions are cached
+        # only the states of the last few positions are used again, so the cache is capped rather than sized for
+        # every position, which would be about a million tables for four rotors
+        cache = SubstitutionCache(min(2 * len(self.positions), POSITION_INDEX_CACHE))
+        enigma = create_enigma_machine(rotors, reflector, ring_settings, self.positions[0], plugboard_pairs, cache)
+        self.entries = {}
+        for index, positions in enumerate(self.positions):
+            enigma.set_positions(positions)
+            for x in range(0, self.offset):
+                enigma.advance_rotors()
+            self.entries.setdefault(enigma.encode(self.crib), []).append(index)
+
+    def lookup(self, code):
+        # returns the starting positions from which the code has the crib at the offset
+        fragment = code[self.offset:self.offset + len(self.crib)]
+        if len(fragment) != len(self.crib):
+            return []
+        return [self.positions[index] for index in self.entries.get(fragment, [])]
+
+    def decode(self, code):
+        # returns (starting positions, plaintext) for each starting position the code matches
+        rotors, reflector, ring_settings, plugboard_pairs = self.settings
+        return [(positions, create_enigma_machine(rotors, reflector, ring_settings, positions, plugboard_pairs).encode(code))
+                for positions in self.lookup(code)]
+
+    def save(self, path):
+        rotors, reflector, ring_settings, plugboard_pairs = self.settings
+        with open(path, "w") as file:
+            json.dump({"rotors": rotors, "reflector": reflector, "ring_settings": ring_settings,
+                       "plugboard": plugboard_pairs, "crib": self.crib, "offset": self.offset,
+                       "entries": self.entries}, file)
+
+# method which reads a PositionIndex written by PositionIndex.save
+def load_position_index(path):
+    with open(path) as file:
+        data = json.load(file)
+    return PositionIndex(data["rotors"], data["reflector"], data["ring_settings"], data["plugboard"],
+                         data["crib"], data["offset"], data["entries"])
+
+# method which finds code two's starting position from an index of its day key, with the crib where it is in the message
+def code_two_index():
+    index = PositionIndex("Beta I III", "B", "23 02 10", ["VH", "PT", "ZG", "BJ", "EY", "FS"], "UNIVERSITY", 22)
+    return [plaintext for positions, plaintext in index.decode("CMFSUPKNCBMUYEQVVDYKLRQZTPUFHSWWAKTUGXMPAMYAFITXIJKMH")]
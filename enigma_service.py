@@ -0,0 +1,237 @@
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import count
+from itertools import islice
+import json
+import multiprocessing
+import os
+import stat
+import sys
+from enigma_code import *
+from enigma_search import code_search_from_name, space_from_spec, search_shard
+# Local job service so many tools can share warm machines and one process pool instead of each
+# importing enigma_code and running on its own. Requests and responses are lines of JSON over a Unix
+# socket or localhost TCP, and each request's responses carry the id it was sent with.
+#
+# {"id": 1, "type": "encode", "rotors": "I II III", "reflector": "B", "ring_settings": "01 01 01",
+#  "initial_positions": "A A Z", "plugboard": ["HL"], "text": "HELLO"}
+#     -> {"id": 1, "type": "result", "text": "..."}   ("decode" is the same as "encode")
+# {"id": 2, "type": "search", "rotors": [...], "reflectors": [...], "ring_settings": [...],
+#  "initial_positions": [...], "plugboards": [[...]], "code": "...", "crib": "...", "shard_size": 1000}
+#     -> {"id": 2, "type": "match", "match": {...}} for each match as soon as its shard finishes
+#     -> {"id": 2, "type": "done", "matches": n}
+# search settings can also be keyspace descriptions, see enigma_search.space_from_spec
+# {"id": 3, "type": "search", "code_search": "code_three_search"} searches one of enigma_search's code searches
+# a request that fails is answered with {"id": ..., "type": "error", "message": "..."}
+
+# machines kept by each worker process, keyed by everything but their starting positions
+worker_machines = OrderedDict()
+worker_cache = SubstitutionCache()
+MAX_WORKER_MACHINES = 256
+# searches kept by each worker process, keyed by their job key, as [space, code, crib, warm machine]
+worker_searches = OrderedDict()
+MAX_WORKER_SEARCHES = 8
+# shards queued for each worker process at a time by one search job
+SHARDS_PER_PROCESS = 2
+# longest line of JSON accepted, search jobs can list many thousands of settings
+LINE_LIMIT = 16 * 1024 * 1024
+
+# method run in a worker process which encodes text with a warm machine for these settings
+def encode_job(rotors, reflector, ring_settings, initial_positions, plugboard_pairs, text):
+    key = (rotors, reflector, ring_settings, tuple(plugboard_pairs))
+    enigma = worker_machines.get(key)
+    if enigma is None:
+        enigma = create_enigma_machine(rotors, reflector, ring_settings, initial_positions, plugboard_pairs, worker_cache)
+        worker_machines[key] = enigma
+        if len(worker_machines) > MAX_WORKER_MACHINES:
+            worker_machines.popitem(last=False)
+    else:
+        worker_machines.move_to_end(key)
+        enigma.set_positions(initial_positions)
+    return enigma.encode(text)
+
+# method which returns (space, code, crib) of a search request
+def search_from_request(request):
+    if "code_search" in request:
+        return code_search_from_name(request["code_search"])()
+    return space_from_spec(request), request["code"], request["crib"]
+
+# method run in a worker process which searches one shard of a search job
+# the request is only sent to a worker which does not have the job yet, so this returns None when it is
+# needed and the shard is sent again with it, and the worker keeps one machine for the job's shards
+def search_job(key, start, stop, request=None):
+    search = worker_searches.get(key)
+    if search is None:
+        if request is None:
+            return None
+        search = list(search_from_request(request)) + [None]
+        worker_searches[key] = search
+        if len(worker_searches) > MAX_WORKER_SEARCHES:
+            worker_searches.popitem(last=False)
+    else:
+        worker_searches.move_to_end(key)
+    space, code, crib, enigma = search
+    if enigma is None:
+        enigma = space.create_machine(*space.candidate(start)[:5])
+        search[3] = enigma
+    return search_shard(space, code, crib, start, stop, enigma=enigma)
+
+
+class EnigmaService:
+    # @param - processes - number of worker processes shared by every job, default is one per core
+    def __init__(self, processes=None):
+        # workers are spawned rather than forked so they do not inherit the sockets of open connections,
+        # which would keep a connection open after the service has closed it
+        self.processes = processes or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(self.processes, mp_context=multiprocessing.get_context("spawn"))
+        # keys workers know each search job by
+        self.job_keys = count()
+        # one service can listen on a Unix socket and TCP at once
+        self.servers = []
+
+    async def start_unix(self, path):
+        # a socket left by a service that was not closed is removed, anything else at the path is left alone
+        if os.path.exists(path) and stat.S_ISSOCK(os.lstat(path).st_mode):
+            os.remove(path)
+        server = await asyncio.start_unix_server(self.handle, path, limit=LINE_LIMIT)
+        self.servers.append(server)
+        return server
+
+    async def start_tcp(self, host="127.0.0.1", port=8765):
+        server = await asyncio.start_server(self.handle, host, port, limit=LINE_LIMIT)
+        self.servers.append(server)
+        return server
+
+    async def close(self):
+        for server in self.servers:
+            server.close()
+            await server.wait_closed()
+        self.servers = []
+        self.executor.shutdown()
+
+    async def handle(self, reader, writer):
+        # each request on a connection is run as its own task, so a long search does not hold up the rest
+        lock = asyncio.Lock()
+        tasks = set()
+        async def send(response):
+            async with lock:
+                writer.write((json.dumps(response) + "\n").encode("ascii"))
+                await writer.drain()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    await send({"id": None, "type": "error", "message": 'invalid request: longer than the line limit'})
+                    break
+                if not line:
+                    break
+                task = asyncio.ensure_future(self.run_request(line, send))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        except ConnectionError:
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    async def run_request(self, line, send):
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            if request.get("type") in ("encode", "decode"):
+                text = await self.encode(request)
+                await send({"id": request_id, "type": "result", "text": text})
+            elif request.get("type") == "search":
+                count = 0
+                async for match in self.search(request):
+                    count += 1
+                    await send({"id": request_id, "type": "match", "match": match})
+                await send({"id": request_id, "type": "done", "matches": count})
+            else:
+                raise ValueError('invalid request: type must be encode, decode or search')
+        except (ValueError, KeyError, TypeError, AttributeError, IndexError) as error:
+            await send({"id": request_id, "type": "error", "message": str(error)})
+
+    async def encode(self, request):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, encode_job, request["rotors"], request["reflector"],
+                                          request["ring_settings"], request["initial_positions"],
+                                          request.get("plugboard", []), request["text"])
+
+    async def search(self, request):
+        # yields the matches of a search job as each shard finishes, in no particular order
+        # a few shards per worker are queued at a time, so a long search does not hold up other jobs' shards
+        space, code, crib = search_from_request(request)
+        search = {key: value for key, value in request.items() if key not in ("id", "type")}
+        key = next(self.job_keys)
+        loop = asyncio.get_running_loop()
+        shards = iter(space.shards(request.get("shard_size", 1000)))
+        futures = {}
+        try:
+            while True:
+                for start, stop in islice(shards, self.processes * SHARDS_PER_PROCESS - len(futures)):
+                    futures[loop.run_in_executor(self.executor, search_job, key, start, stop)] = (start, stop)
+                if not futures:
+                    break
+                finished, pending = await asyncio.wait(futures, return_when=asyncio.FIRST_COMPLETED)
+                for future in finished:
+                    start, stop = futures.pop(future)
+                    matches = future.result()
+                    if matches is None:
+                        # the worker does not have this search yet
+                        futures[loop.run_in_executor(self.executor, search_job, key, start, stop, search)] = (start, stop)
+                        continue
+                    for match in matches:
+                        yield match
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+# method which sends one job to a running service and yields its responses until the job is finished
+# @param - job - request dictionary without an id
+# @param - path - Unix socket of the service, or None to connect over TCP to host and port
+async def send_job(job, path=None, host="127.0.0.1", port=8765):
+    if path is not None:
+        reader, writer = await asyncio.open_unix_connection(path, limit=LINE_LIMIT)
+    else:
+        reader, writer = await asyncio.open_connection(host, port, limit=LINE_LIMIT)
+    try:
+        writer.write((json.dumps(dict(job, id=1)) + "\n").encode("ascii"))
+        await writer.drain()
+        while True:
+            line = await reader.readline()
+            if not line:
+                raise ConnectionError('service closed the connection before the job finished')
+            response = json.loads(line)
+            yield response
+            if response["type"] in ("result", "done", "error"):
+                return
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+# method which runs the service until it is interrupted
+def run_service(path=None, host="127.0.0.1", port=8765, processes=None):
+    async def serve():
+        service = EnigmaService(processes)
+        if path is not None:
+            server = await service.start_unix(path)
+        else:
+            server = await service.start_tcp(host, port)
+        try:
+            await server.serve_forever()
+        finally:
+            await service.close()
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    # python enigma_service.py [unix socket path], localhost TCP port 8765 without one
+    run_service(sys.argv[1] if len(sys.argv) > 1 else None)